@@ -0,0 +1,297 @@
+import asyncio
+import random
+import time
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Deque, Iterable, List, Optional, Set, Tuple
+
+from app.core import DriftStats, Training, Workout, WorkoutEvent, event_key
+from app.metrics import (
+    EVENTS_DROPPED,
+    EVENTS_EMITTED,
+    SERIALIZATION_TIME,
+    STREAM_RESUMES,
+    TICK_LATENESS,
+)
+from app.serializer import encode_binary, encode_event, encode_sse
+
+KEEP_ALIVE = b": keep-alive\n\n"
+# reconnect delays are spread over [retry, retry * (1 + RETRY_JITTER)]
+RETRY_JITTER = 0.5
+
+
+class Frame:
+    """A published event with its encodings, each built at most once."""
+
+    __slots__ = ("event", "sequence", "id", "_sse", "_json", "_binary")
+
+    def __init__(self, event: WorkoutEvent, sequence: int = 0, epoch: str = "") -> None:
+        self.event: WorkoutEvent = event
+        self.sequence: int = sequence
+        # SSE event id, unique across broadcasters thanks to the epoch
+        self.id: Optional[str] = f"{epoch}-{sequence}" if sequence else None
+        self._sse: Optional[bytes] = None
+        self._json: Optional[bytes] = None
+        self._binary: Optional[bytes] = None
+
+    def sse(self) -> bytes:
+        if self._sse is None:
+            started = time.perf_counter()
+            self._sse = encode_sse(self.event, self.id)
+            SERIALIZATION_TIME.observe(time.perf_counter() - started)
+        return self._sse
+
+    def json(self) -> bytes:
+        if self._json is None:
+            started = time.perf_counter()
+            self._json = encode_event(self.event)
+            SERIALIZATION_TIME.observe(time.perf_counter() - started)
+        return self._json
+
+    def binary(self) -> bytes:
+        if self._binary is None:
+            started = time.perf_counter()
+            self._binary = encode_binary(self.event)
+            SERIALIZATION_TIME.observe(time.perf_counter() - started)
+        return self._binary
+
+
+class Subscriber:
+    """Latest-value mailbox of published frames for a single client.
+
+    Only the newest frame is kept: a frame the client has not picked up yet
+    is replaced by the next one, so a client that falls behind skips to the
+    current state, its memory stays constant and the producer never blocks
+    on it. Frames missed before a resume are handed out first. Once closed
+    (the broadcaster went away), `get` returns None.
+    """
+
+    __slots__ = ("_backlog", "_latest", "_ready", "_dropped", "_closed")
+
+    def __init__(self, backlog: Iterable[Frame] = ()) -> None:
+        self._backlog: Deque[Frame] = deque(backlog)
+        self._latest: Optional[Frame] = None
+        self._ready: asyncio.Event = asyncio.Event()
+        self._dropped: int = 0
+        self._closed: bool = False
+        if self._backlog:
+            self._ready.set()
+
+    def get_dropped(self) -> int:
+        return self._dropped
+
+    def put(self, frame: Frame) -> None:
+        if self._latest is not None:
+            self._dropped += 1
+            EVENTS_DROPPED.inc()
+        self._latest = frame
+        self._ready.set()
+
+    def take(self) -> Optional[Frame]:
+        """Next frame without waiting, None if there is none."""
+        if self._backlog:
+            frame = self._backlog.popleft()
+        else:
+            frame, self._latest = self._latest, None
+        if not self._backlog and self._latest is None and not self._closed:
+            self._ready.clear()
+        return frame
+
+    def close(self) -> None:
+        self._closed = True
+        self._ready.set()
+
+    async def get(self) -> Optional[Frame]:
+        while True:
+            await self._ready.wait()
+            frame = self.take()
+            if frame is not None or self._closed:
+                return frame
+
+
+class Broadcaster:
+    """Single tick producer for a workout, fanned out to every subscriber.
+
+    Each event is wrapped in a single Frame handed to all subscribers,
+    so every encoding of it is produced at most once. Only events that change
+    what a display shows are published; idle streams get a keep-alive comment
+    every `heartbeat_seconds` instead. The producer only runs while someone is
+    listening.
+
+    Frames carry increasing ids and the last `history_size` of them are kept,
+    so a client reconnecting with the id of the last frame it saw gets only
+    the frames it missed, or the latest one if the gap is too old. Ids are
+    prefixed with a random epoch per broadcaster, so ids handed out before a
+    restart (or by a previous session of the same name) never match.
+
+    Control actions call `publish` to hand the new state to every subscriber
+    before they return, rather than leaving it to the producer's wake-up.
+    """
+
+    def __init__(
+        self,
+        workout: Workout,
+        training: Training,
+        heartbeat_seconds: float = 15.0,
+        history_size: int = 16,
+        retry_seconds: float = 3.0,
+    ) -> None:
+        if history_size < 1:
+            raise ValueError("history_size must be positive")
+
+        self._workout: Workout = workout
+        self._training: Training = training
+        self._heartbeat_seconds: float = heartbeat_seconds
+        self._subscribers: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._history: Deque[Frame] = deque(maxlen=history_size)
+        self._sequence: int = 0
+        self._epoch: str = f"{random.getrandbits(32):08x}"
+        self._retry_seconds: float = retry_seconds
+        self._drift: DriftStats = DriftStats()
+        # display of the last published frame, shared by `publish` and the producer
+        self._last_key: Optional[Tuple] = None
+
+    def get_drift(self) -> DriftStats:
+        return self._drift
+
+    def get_subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def set_training(self, training: Training) -> None:
+        self._training = training
+        self._last_key = None
+        # restart the producer on the new schedule
+        if self._task is not None:
+            self._task.cancel()
+            self._task = asyncio.create_task(self._produce())
+            self.publish()
+
+    def publish(self) -> Optional[Frame]:
+        """
+        Publish the current state of the workout right away.
+
+        Returns the frame, or None if nobody is listening or nothing a display
+        shows has changed. The producer skips the same state when it wakes up.
+        """
+        if self._task is None:
+            return None
+        return self._emit(self._workout.snapshot(self._training.compile()))
+
+    def _parse_id(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Sequence number of one of our own event ids, None for anything else."""
+        if last_event_id is None:
+            return None
+        epoch, _, sequence = last_event_id.partition("-")
+        if epoch != self._epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def get_missed(self, last_event_id: Optional[str] = None) -> List[Frame]:
+        """Frames published after `last_event_id`, or the latest one if unknown."""
+        if not self._history:
+            return []
+        sequence = self._parse_id(last_event_id)
+        first = self._history[0].sequence
+        if sequence is None or not first <= sequence <= self._history[-1].sequence:
+            return [self._history[-1]]
+        # sequence numbers in the history are consecutive
+        return list(islice(self._history, sequence - first + 1, None))
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscriber:
+        # late joiners see the current state (or what they missed) right away
+        subscriber = Subscriber(self.get_missed(last_event_id))
+        self._subscribers.add(subscriber)
+        if self._task is None:
+            self._task = asyncio.create_task(self._produce())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            # nothing is published while stopped, so the history goes stale
+            self._history.clear()
+            self._last_key = None
+
+    async def close(self) -> None:
+        # ends every stream and WebSocket still attached
+        for subscriber in self._subscribers:
+            subscriber.close()
+        self._subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._history.clear()
+        self._last_key = None
+
+    async def stream(
+        self, last_event_id: Optional[str] = None, hz: Optional[float] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        SSE messages of published frames, plus keep-alives while idle.
+
+        With `hz`, frames of the same status are sent at most `hz` times per
+        second; in between only the newest one is kept. A status change (e.g.
+        a pause) is sent right away.
+        """
+        if hz is not None and hz <= 0:
+            raise ValueError("hz must be positive")
+        period = 1 / hz if hz else 0.0
+        if last_event_id is not None:
+            STREAM_RESUMES.inc()
+        subscriber = self.subscribe(last_event_id)
+        # the reconnect hint goes out with the first message
+        retry = self._retry_seconds * random.uniform(1, 1 + RETRY_JITTER)
+        prefix = b"retry: %d\n\n" % (retry * 1000)
+        status, deadline = None, 0.0
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(
+                        subscriber.get(), self._heartbeat_seconds
+                    )
+                except TimeoutError:
+                    yield prefix + KEEP_ALIVE
+                    prefix = b""
+                    continue
+                # hold back ticks until the next slot, keeping only the newest
+                while frame is not None and frame.event.status == status:
+                    delay = deadline - time.monotonic()
+                    if delay <= 0:
+                        break
+                    try:
+                        frame = await asyncio.wait_for(subscriber.get(), delay)
+                    except TimeoutError:
+                        break
+                if frame is None:
+                    return
+                status, deadline = frame.event.status, time.monotonic() + period
+                yield prefix + frame.sse()
+                prefix = b""
+        finally:
+            self.unsubscribe(subscriber)
+
+    async def _produce(self) -> None:
+        async for event in self._workout.arun(
+            self._training, on_lateness=TICK_LATENESS.observe, drift=self._drift
+        ):
+            self._emit(event)
+
+    def _emit(self, event: WorkoutEvent) -> Optional[Frame]:
+        key = event_key(event)
+        if key == self._last_key:
+            return None
+        self._last_key = key
+        self._sequence += 1
+        frame = Frame(event, self._sequence, self._epoch)
+        self._history.append(frame)
+        EVENTS_EMITTED.inc()
+        for subscriber in self._subscribers:
+            subscriber.put(frame)
+        return frame
@@ -0,0 +1,336 @@
+"""Bulk import and export of library trainings as NDJSON or CSV.
+
+NDJSON has one `LibraryTrainingCreate` object per line. CSV has one row per
+interval, consecutive rows with the same `id` form one training:
+
+    id,training,max_rounds,owner,tags,interval,time_seconds,color
+    1,Tabata,8,ann,hiit;short,Work,20,#FF0000
+    1,Tabata,8,ann,hiit;short,Rest,10,#00FF00
+
+The `id` only groups rows (exports use the library entry id), imported
+trainings get new ids. Without an `id` column, consecutive rows with the
+same training name, rounds, owner and tags are grouped. Only `training`,
+`interval` and `time_seconds` columns are required; tags are separated by
+`;`. Quoted fields may span lines. CSV has no notion of blocks, trainings
+with blocks are left out of CSV exports; use NDJSON for those.
+
+Input is consumed line by line and stored in batches, so memory use does not
+depend on the size of the file. Invalid trainings are reported with their
+line number and skipped, the rest is imported.
+"""
+
+import csv
+import io
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.library import Library, LibraryEntry
+from app.model import BlockCreate, LibraryTrainingCreate, TrainingCreate
+from app.util import to_training_create
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+CSV_COLUMNS = (
+    "id",
+    "training",
+    "max_rounds",
+    "owner",
+    "tags",
+    "interval",
+    "time_seconds",
+    "color",
+)
+_REQUIRED_COLUMNS = {"training", "interval", "time_seconds"}
+TAG_SEPARATOR = ";"
+
+# trainings stored per transaction
+BATCH_SIZE = 1000
+# row errors reported in detail, the rest is only counted
+MAX_REPORTED_ERRORS = 100
+
+
+class RowError(NamedTuple):
+    line: int
+    error: str
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    failed: int
+    errors: List[RowError]
+
+
+# union tags of intervals and blocks, not helpful in an error location
+_ITEM_TAGS = {"interval", "block"}
+
+
+def _describe(error: ValidationError) -> str:
+    messages = []
+    for e in error.errors(include_url=False):
+        loc = ".".join(str(p) for p in e["loc"] if p not in _ITEM_TAGS)
+        messages.append(f"{loc}: {e['msg']}" if loc else e["msg"])
+    return "; ".join(messages)
+
+
+class LineSplitter:
+    """Splits a stream of byte chunks into decoded lines."""
+
+    def __init__(self) -> None:
+        self._pending: bytes = b""
+
+    def feed(self, chunk: bytes) -> List[str]:
+        lines = (self._pending + chunk).split(b"\n")
+        self._pending = lines.pop()
+        return [line.decode("utf-8-sig").rstrip("\r") for line in lines]
+
+    def close(self) -> List[str]:
+        pending, self._pending = self._pending, b""
+        return [pending.decode("utf-8-sig").rstrip("\r")] if pending else []
+
+
+class _CsvGroup:
+    __slots__ = ("key", "training", "intervals", "lines")
+
+    def __init__(self, key: Tuple, row: Dict[str, str]) -> None:
+        self.key: Tuple = key
+        self.training: Dict[str, str] = row
+        self.intervals: List[Dict[str, str]] = []
+        # first line of every interval row
+        self.lines: List[int] = []
+
+
+class _LineQueue(deque):
+    """Lines handed to a `csv.reader` as they arrive; never exhausted for good."""
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self:
+            raise StopIteration
+        return self.popleft()
+
+
+class Importer:
+    """
+    Validates trainings line by line and stores them in batches.
+
+    Feed it lines with `add` and call `close` at the end of the input.
+    Raises ValueError if the input cannot be parsed at all (e.g. a CSV
+    header without the required columns).
+    """
+
+    def __init__(
+        self, library: Library, format: str = "ndjson", batch_size: int = BATCH_SIZE
+    ) -> None:
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+
+        self._library: Library = library
+        self._format: str = format
+        self._batch_size: int = batch_size
+        self._batch: List[Tuple[TrainingCreate, str, List[str]]] = []
+        self._line: int = 0
+        self._imported: int = 0
+        self._failed: int = 0
+        self._errors: List[RowError] = []
+        self._columns: Optional[List[str]] = None
+        self._group: Optional[_CsvGroup] = None
+        # one reader for the whole input, fed a record at a time
+        self._csv_lines: _LineQueue = _LineQueue()
+        self._csv_reader = csv.reader(self._csv_lines, strict=True)
+        # first line of the CSV record being read and whether a quote is open
+        self._record_line: int = 0
+        self._quoted: bool = False
+
+    def add(self, line: str) -> None:
+        self._line += 1
+        if self._format == "ndjson":
+            if line.strip():
+                self._add_json(line)
+            return
+
+        if not self._quoted:
+            if not line.strip():
+                return
+            self._record_line = self._line
+        self._csv_lines.append(line + "\n")
+        # a record ends on a line break outside quotes; "" counts twice
+        if line.count('"') % 2:
+            self._quoted = not self._quoted
+        if not self._quoted:
+            self._read_csv()
+
+    def close(self) -> ImportResult:
+        if self._quoted:
+            self._quoted = False
+            self._read_csv()
+        if self._group is not None:
+            self._add_group(self._group)
+            self._group = None
+        self._flush()
+        return ImportResult(self._imported, self._failed, self._errors)
+
+    def _add_json(self, line: str) -> None:
+        try:
+            payload = LibraryTrainingCreate.model_validate_json(line)
+        except ValidationError as e:
+            self._fail(self._line, _describe(e))
+            return
+        self._append(payload)
+
+    def _read_csv(self) -> None:
+        line = self._record_line
+        try:
+            values = next(self._csv_reader)
+        except csv.Error as e:
+            self._csv_lines.clear()
+            self._fail(line, str(e))
+            return
+        if self._columns is None:
+            self._columns = [c.strip() for c in values]
+            missing = _REQUIRED_COLUMNS.difference(self._columns)
+            if missing:
+                raise ValueError(f"missing CSV columns: {', '.join(sorted(missing))}")
+            return
+
+        if len(values) != len(self._columns):
+            self._fail(line, f"expected {len(self._columns)} columns")
+            return
+        row = dict(zip(self._columns, values))
+        if "id" in row:
+            key = (row["id"],)
+        else:
+            key = tuple(
+                row.get(c, "") for c in ("training", "max_rounds", "owner", "tags")
+            )
+        group = self._group
+        if group is None or group.key != key:
+            if group is not None:
+                self._add_group(group)
+            group = self._group = _CsvGroup(key, row)
+        interval = {"name": row["interval"], "time_seconds": row["time_seconds"]}
+        if row.get("color"):
+            interval["color"] = row["color"]
+        group.intervals.append(interval)
+        group.lines.append(line)
+
+    def _add_group(self, group: _CsvGroup) -> None:
+        row = group.training
+        tags = row.get("tags", "")
+        try:
+            payload = LibraryTrainingCreate.model_validate(
+                {
+                    "name": row["training"],
+                    "max_rounds": row.get("max_rounds") or None,
+                    "owner": row.get("owner", ""),
+                    "tags": [t for t in tags.split(TAG_SEPARATOR) if t],
+                    "intervals": group.intervals,
+                }
+            )
+        except ValidationError as e:
+            line = group.lines[0]
+            loc = e.errors()[0]["loc"]
+            # point at the offending interval row
+            if len(loc) > 1 and loc[0] == "intervals" and isinstance(loc[1], int):
+                line = group.lines[loc[1]]
+            self._fail(line, _describe(e))
+            return
+        self._append(payload)
+
+    def _append(self, payload: LibraryTrainingCreate) -> None:
+        self._batch.append((to_training_create(payload), payload.owner, payload.tags))
+        if len(self._batch) >= self._batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._batch:
+            self._library.create_many(self._batch)
+            self._imported += len(self._batch)
+            self._batch.clear()
+
+    def _fail(self, line: int, error: str) -> None:
+        self._failed += 1
+        if len(self._errors) < MAX_REPORTED_ERRORS:
+            self._errors.append(RowError(line, error))
+
+
+def import_trainings(
+    library: Library, lines: Iterable[str], format: str = "ndjson"
+) -> ImportResult:
+    """Import trainings from lines of NDJSON or CSV, e.g. an open text file."""
+    importer = Importer(library, format)
+    for line in lines:
+        importer.add(line.rstrip("\r\n"))
+    return importer.close()
+
+
+def _encode_json(entry: LibraryEntry) -> str:
+    training = entry.training
+    return LibraryTrainingCreate(
+        name=training.name,
+        max_rounds=training.max_rounds,
+        intervals=training.intervals,
+        owner=entry.owner,
+        tags=list(entry.tags),
+    ).model_dump_json()
+
+
+def _encode_csv(writer, entry: LibraryEntry) -> None:
+    training = entry.training
+    if any(isinstance(i, BlockCreate) for i in training.intervals):
+        return
+    max_rounds = "" if training.max_rounds is None else training.max_rounds
+    tags = TAG_SEPARATOR.join(entry.tags)
+    writer.writerows(
+        (
+            entry.id,
+            training.name,
+            max_rounds,
+            entry.owner,
+            tags,
+            i.name,
+            i.time_seconds,
+            i.color,
+        )
+        for i in training.intervals
+    )
+
+
+def export_trainings(
+    library: Library,
+    format: str = "ndjson",
+    name: Optional[str] = None,
+    owner: Optional[str] = None,
+    tag: Optional[str] = None,
+    page_size: int = BATCH_SIZE,
+) -> Iterator[bytes]:
+    """Library entries in the import format, one chunk per page of entries."""
+    if format not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if format == "csv":
+        writer.writerow(CSV_COLUMNS)
+
+    cursor = None
+    while True:
+        entries, cursor = library.list(name, owner, tag, cursor, page_size)
+        for entry in entries:
+            if format == "csv":
+                _encode_csv(writer, entry)
+            else:
+                buffer.write(_encode_json(entry))
+                buffer.write("\n")
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if cursor is None:
+            return
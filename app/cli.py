@@ -0,0 +1,239 @@
+"""Terminal runner for headless displays: `interval-timer run plan.json`.
+
+The plan is a training in the JSON format of `POST /training`. Everything
+runs on one asyncio loop: `Workout.arun` sleeps until the next second
+boundary (or control action), and input is read by a reader callback on
+stdin, so nothing polls in between. Only the screen rows whose text changed
+are rewritten.
+
+Keys on a terminal: space starts or pauses, s stops, q quits. When stdin is
+not a terminal (e.g. a pipe from a kiosk controller), commands are read as
+lines instead: start, pause, toggle, stop or quit.
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import termios
+import tty
+from contextlib import contextmanager
+from typing import IO, Iterator, List, Optional
+
+from app.core import Training, Workout, WorkoutEvent
+from app.model import TrainingCreate, WorkoutStatus
+from app.util import to_model
+
+KEYS = {" ": "toggle", "s": "stop", "q": "quit"}
+COMMANDS = ("start", "pause", "toggle", "stop", "quit")
+HELP = "[space] start/pause  [s] stop  [q] quit"
+
+# cursor movement and clearing
+_MOVE = "\x1b[%d;1H"
+_CLEAR_LINE = "\x1b[K"
+_CLEAR_SCREEN = "\x1b[2J"
+_HIDE_CURSOR = "\x1b[?25l"
+_SHOW_CURSOR = "\x1b[?25h"
+
+
+class InputParser:
+    """Turns raw input into commands: single keys or, if `keys` is False, lines."""
+
+    def __init__(self, keys: bool = True) -> None:
+        self._keys: bool = keys
+        self._pending: bytes = b""
+
+    def feed(self, data: bytes) -> List[str]:
+        if self._keys:
+            text = data.decode(errors="ignore").lower()
+            return [KEYS[key] for key in text if key in KEYS]
+
+        lines = (self._pending + data).split(b"\n")
+        self._pending = lines.pop()
+        words = (line.decode(errors="ignore").strip().lower() for line in lines)
+        return [word for word in words if word in COMMANDS]
+
+
+class Screen:
+    """Fixed rows of text; `update` returns output for the rows that changed.
+
+    Without `ansi` every change is written as one plain line instead, for
+    output that is logged rather than displayed.
+    """
+
+    def __init__(self, title: str, ansi: bool = True) -> None:
+        self._title: str = title
+        self._ansi: bool = ansi
+        self._rows: List[str] = []
+
+    def get_height(self) -> int:
+        return len(self._rows)
+
+    def rows(self, event: WorkoutEvent) -> List[str]:
+        if event.max_rounds is None:
+            rounds = f"Round {event.current_round + 1}"
+        else:
+            current = min(event.current_round + 1, event.max_rounds)
+            rounds = f"Round {current} of {event.max_rounds}"
+        return [
+            self._title,
+            "",
+            event.interval_name,
+            f"{event.remaining_hh:02d}:{event.remaining_mm:02d}:"
+            f"{event.remaining_ss:02d}",
+            rounds,
+            event.status.value,
+            "",
+            HELP,
+        ]
+
+    def update(self, event: WorkoutEvent) -> str:
+        rows = self.rows(event)
+        previous, self._rows = self._rows, rows
+        if not self._ansi:
+            if rows == previous:
+                return ""
+            return " | ".join(row for row in rows[2:6]) + "\n"
+
+        output = [] if previous else [_CLEAR_SCREEN]
+        for number, row in enumerate(rows, 1):
+            if number > len(previous) or previous[number - 1] != row:
+                output.append(_MOVE % number + row + _CLEAR_LINE)
+        return "".join(output)
+
+
+def apply_command(workout: Workout, command: str) -> None:
+    if command == "start":
+        workout.start()
+    elif command == "pause":
+        workout.pause()
+    elif command == "stop":
+        workout.stop()
+    elif command == "toggle":
+        if workout.get_state() == WorkoutStatus.RUNNING:
+            workout.pause()
+        else:
+            workout.start()
+    else:
+        raise ValueError(f"unknown command {command!r}")
+
+
+@contextmanager
+def _cbreak(fd: int) -> Iterator[None]:
+    """Unbuffered, unechoed key input on a terminal; a no-op elsewhere."""
+    if not os.isatty(fd):
+        yield
+        return
+
+    saved = termios.tcgetattr(fd)
+    tty.setcbreak(fd)
+    try:
+        yield
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+
+async def run(
+    training: Training,
+    workout: Workout,
+    input_fd: int,
+    output: IO[str],
+    keys: bool = True,
+    ansi: bool = True,
+) -> None:
+    """Show `workout` on `output` and apply commands read from `input_fd`.
+
+    Returns on a quit command or on SIGINT/SIGTERM.
+    """
+    loop = asyncio.get_running_loop()
+    done = asyncio.Event()
+    parser = InputParser(keys)
+    screen = Screen(training.get_name(), ansi)
+
+    def on_input() -> None:
+        try:
+            data = os.read(input_fd, 1024)
+        except BlockingIOError:
+            return
+        if not data:
+            # input closed, keep showing the workout until a signal
+            loop.remove_reader(input_fd)
+            return
+        for command in parser.feed(data):
+            if command == "quit":
+                done.set()
+            else:
+                apply_command(workout, command)
+
+    async def display() -> None:
+        async for event in workout.arun(training):
+            text = screen.update(event)
+            if text:
+                output.write(text)
+                output.flush()
+
+    loop.add_reader(input_fd, on_input)
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, done.set)
+    if ansi:
+        output.write(_HIDE_CURSOR)
+    task = asyncio.create_task(display())
+    try:
+        await done.wait()
+    finally:
+        task.cancel()
+        loop.remove_reader(input_fd)
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(signum)
+        if ansi:
+            # leave the shell prompt below the display
+            output.write(_MOVE % (screen.get_height() + 1) + _SHOW_CURSOR)
+        output.flush()
+
+
+def load_plan(path: str) -> Training:
+    with open(path, "rb") as f:
+        payload = TrainingCreate.model_validate_json(f.read())
+    return to_model(payload)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="interval-timer")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run a training in the terminal")
+    run_parser.add_argument("plan", help="training as JSON, like POST /training")
+    run_parser.add_argument(
+        "--start", action="store_true", help="start right away instead of stopped"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        training = load_plan(args.plan)
+    except OSError as e:
+        parser.error(str(e))
+    except ValueError as e:
+        # pydantic's ValidationError included
+        parser.error(f"invalid plan {args.plan}:\n{e}")
+
+    workout = Workout()
+    if args.start:
+        workout.start()
+    fd = sys.stdin.fileno()
+    interactive = os.isatty(fd)
+    with _cbreak(fd):
+        asyncio.run(
+            run(
+                training,
+                workout,
+                fd,
+                sys.stdout,
+                keys=interactive,
+                ansi=sys.stdout.isatty(),
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
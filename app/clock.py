@@ -0,0 +1,70 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class Clock(ABC):
+    """Monotonic time source of a workout, in seconds."""
+
+    __slots__ = ()
+
+    @abstractmethod
+    def now(self) -> float: ...
+
+    @abstractmethod
+    async def wait(self, event: asyncio.Event, timeout: Optional[float]) -> bool:
+        """Wait until `event` is set or `timeout` seconds passed.
+
+        Returns True if the event was set. A timeout of None waits forever.
+        """
+
+
+class MonotonicClock(Clock):
+    __slots__ = ()
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    async def wait(self, event: asyncio.Event, timeout: Optional[float]) -> bool:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except TimeoutError:
+            return False
+
+
+class VirtualClock(Clock):
+    """Clock that only moves when told to.
+
+    Waiting with a timeout advances the clock instantly instead of sleeping,
+    so whole workouts can be simulated in milliseconds.
+    """
+
+    __slots__ = ("_now",)
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now: float = start
+
+    def now(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        if seconds < 0:
+            raise ValueError("seconds must not be negative")
+        self._now += seconds
+
+    async def wait(self, event: asyncio.Event, timeout: Optional[float]) -> bool:
+        # give other tasks a chance to set the event before time jumps
+        await asyncio.sleep(0)
+        if event.is_set():
+            return True
+        if timeout is None:
+            await event.wait()
+            return True
+        self.advance(timeout)
+        return False
+
+
+# shared default, the monotonic clock is stateless
+MONOTONIC_CLOCK = MonotonicClock()
@@ -0,0 +1,59 @@
+import os
+from dataclasses import dataclass
+
+
+def _env(name: str, default: str) -> str:
+    return os.environ.get(f"INTERVAL_TIMER_{name}", default)
+
+
+@dataclass(frozen=True)
+class Settings:
+    max_sessions: int = 10_000
+    session_ttl_seconds: float = 3600.0
+    heartbeat_seconds: float = 15.0
+    # base reconnect delay suggested to SSE clients
+    retry_seconds: float = 3.0
+    # crash recovery journal, disabled when empty
+    journal_path: str = ""
+    journal_flush_seconds: float = 0.05
+    journal_compact_after: int = 1000
+    # shared memory segment for the default session across worker
+    # processes, disabled when empty
+    shared_state_name: str = ""
+    shared_state_capacity: int = 1 << 20
+    shared_poll_seconds: float = 0.02
+    # SQLite database of saved trainings, shared by all worker processes;
+    # ":memory:" keeps it per process and only until a restart
+    library_path: str = "library.db"
+    library_cache_size: int = 256
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            max_sessions=int(_env("MAX_SESSIONS", str(cls.max_sessions))),
+            session_ttl_seconds=float(
+                _env("SESSION_TTL_SECONDS", str(cls.session_ttl_seconds))
+            ),
+            heartbeat_seconds=float(
+                _env("HEARTBEAT_SECONDS", str(cls.heartbeat_seconds))
+            ),
+            retry_seconds=float(_env("RETRY_SECONDS", str(cls.retry_seconds))),
+            journal_path=_env("JOURNAL_PATH", cls.journal_path),
+            journal_flush_seconds=float(
+                _env("JOURNAL_FLUSH_SECONDS", str(cls.journal_flush_seconds))
+            ),
+            journal_compact_after=int(
+                _env("JOURNAL_COMPACT_AFTER", str(cls.journal_compact_after))
+            ),
+            shared_state_name=_env("SHARED_STATE_NAME", cls.shared_state_name),
+            shared_state_capacity=int(
+                _env("SHARED_STATE_CAPACITY", str(cls.shared_state_capacity))
+            ),
+            shared_poll_seconds=float(
+                _env("SHARED_POLL_SECONDS", str(cls.shared_poll_seconds))
+            ),
+            library_path=_env("LIBRARY_PATH", cls.library_path),
+            library_cache_size=int(
+                _env("LIBRARY_CACHE_SIZE", str(cls.library_cache_size))
+            ),
+        )
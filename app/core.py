@@ -1,9 +1,17 @@
-import time
-from typing import List, Optional, Tuple
-from app.model import IntervalEvent, WorkoutStatus
+import asyncio
+import math
+import threading
+from bisect import bisect_right
+from array import array
+from itertools import accumulate
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from app.clock import MONOTONIC_CLOCK, Clock
+from app.status import WorkoutStatus
 
 
 class Interval:
+    __slots__ = ("_name", "_color", "_time_seconds", "_remaining_seconds")
+
     def __init__(self, name: str, time_seconds: int, color: str = "#FFFFFF") -> None:
         if time_seconds <= 0:
             raise ValueError("time_seconds must be positive")
@@ -41,9 +49,78 @@ class Interval:
         return self._time_seconds
 
 
+class Block:
+    """Intervals (or nested blocks) repeated `repeat` times.
+
+    Repetitions are separated by a rest interval of `rest_seconds`, if any.
+    """
+
+    __slots__ = ("_name", "_intervals", "_repeat", "_rest")
+
+    def __init__(
+        self,
+        name: str,
+        intervals: List[Union[Interval, "Block"]],
+        repeat: int = 1,
+        rest_seconds: int = 0,
+    ) -> None:
+        if name is None:
+            raise ValueError("name must be provided")
+
+        if intervals is None or len(intervals) == 0:
+            raise ValueError("intervals must be provided")
+
+        if repeat < 1:
+            raise ValueError("repeat must be positive")
+
+        if rest_seconds < 0:
+            raise ValueError("rest_seconds must not be negative")
+
+        self._name: str = name
+        self._intervals: List[Union[Interval, Block]] = intervals
+        self._repeat: int = repeat
+        self._rest: Optional[Interval] = (
+            Interval("Rest", rest_seconds) if rest_seconds else None
+        )
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_intervals(self):
+        for item in self._intervals:
+            yield item
+
+    def get_repeat(self) -> int:
+        return self._repeat
+
+    def get_rest(self) -> Optional[Interval]:
+        return self._rest
+
+    def get_rest_seconds(self) -> int:
+        return 0 if self._rest is None else self._rest.get_time_seconds()
+
+    def reset(self) -> None:
+        for item in self._intervals:
+            item.reset()
+        if self._rest is not None:
+            self._rest.reset()
+
+
 class Training:
+    __slots__ = (
+        "_name",
+        "_intervals",
+        "_current_index",
+        "_current_round",
+        "_max_rounds",
+        "_schedule",
+    )
+
     def __init__(
-        self, name: str, intervals: List[Interval], max_rounds: Optional[int] = None
+        self,
+        name: str,
+        intervals: List[Union[Interval, Block]],
+        max_rounds: Optional[int] = None,
     ) -> None:
         if name is None:
             raise ValueError("name must be provided")
@@ -55,11 +132,12 @@ class Training:
             raise ValueError("inverall must be provided")
 
         self._name: str = name
-        self._intervals: List[Interval] = []
+        self._intervals: List[Union[Interval, Block]] = []
         self._current_index: int = 0
         self._current_round: int = 0
         self._max_rounds: Optional[int] = max_rounds
         self._intervals = intervals
+        self._schedule: Optional[Schedule] = None
 
     def get_name(self) -> str:
         return self._name
@@ -70,10 +148,10 @@ class Training:
     def get_max_rounds(self) -> int:
         return self._max_rounds
 
-    def get_current_interval(self) -> Interval:
+    def get_current_interval(self) -> Union[Interval, Block]:
         return self._intervals[self._current_index]
 
-    def next_interval(self) -> Interval:
+    def next_interval(self) -> Union[Interval, Block]:
         if self._intervals is None or len(self._intervals) == 0:
             raise ValueError("No Intveral given")
 
@@ -89,6 +167,14 @@ class Training:
         for item in self._intervals:
             yield item
 
+    def compile(self) -> "Schedule":
+        if self._schedule is None:
+            self._schedule = Schedule(self)
+        return self._schedule
+
+    def state_at(self, elapsed: float) -> "TimelineState":
+        return self.compile().state_at(elapsed)
+
     def reset_all(self) -> None:
         for interval in self._intervals:
             interval.reset()
@@ -105,113 +191,598 @@ class Training:
         return False
 
 
-class Workout:
+class WorkoutEvent(NamedTuple):
+    """Internal, unvalidated counterpart of `app.model.IntervalEvent`."""
+
+    interval_name: str
+    interval_index: int
+    status: WorkoutStatus
+    remaining_seconds: int
+    remaining_hh: int
+    remaining_mm: int
+    remaining_ss: int
+    current_round: int
+    max_rounds: Optional[int]
+    duration: float
+    paused: float = 0.0
+
+
+class WorkoutRecord(NamedTuple):
+    """State of a workout needed to rebuild it, timestamps in clock time."""
+
+    status: WorkoutStatus
+    started_at: float
+    paused_at: float
+    paused_total: float
+
+
+class TimelineState(NamedTuple):
+    current_round: int
+    index: int
+    interval: Interval
+    remaining: float
+    finished: bool
+
+
+class TimelineEntry(NamedTuple):
+    position: int
+    current_round: int
+    index: int
+    interval: Interval
+    start: float
+    end: float
+
+
+class _Node:
+    """One repetition of a block (or one round of a training), compiled.
+
+    `ends` and `counts` are prefix sums of the durations and of the number
+    of intervals of the items, so a position in time or a flattened interval
+    index is found with one binary search per nesting level.
+    """
+
+    __slots__ = (
+        "items",
+        "ends",
+        "counts",
+        "body_seconds",
+        "body_count",
+        "rest",
+        "repeat",
+        "duration",
+        "count",
+    )
+
+    def __init__(
+        self,
+        items: List[Union[Interval, Block]],
+        repeat: int = 1,
+        rest: Optional[Interval] = None,
+    ) -> None:
+        self.items: List[Union[Interval, _Node]] = [
+            _Node(list(i.get_intervals()), i.get_repeat(), i.get_rest())
+            if isinstance(i, Block)
+            else i
+            for i in items
+        ]
+        self.ends: array = array(
+            "d",
+            accumulate(
+                i.duration if isinstance(i, _Node) else i.get_time_seconds()
+                for i in self.items
+            ),
+        )
+        self.counts: array = array(
+            "q", accumulate(i.count if isinstance(i, _Node) else 1 for i in self.items)
+        )
+        self.body_seconds: float = self.ends[-1]
+        self.body_count: int = self.counts[-1]
+        self.rest: Optional[Interval] = rest
+        self.repeat: int = repeat
+        rest_seconds = 0 if rest is None else rest.get_time_seconds()
+        self.duration: float = repeat * self.body_seconds + (repeat - 1) * rest_seconds
+        self.count: int = repeat * self.body_count + (repeat - 1) * (rest is not None)
+
+    def find(self, offset: float) -> Tuple[int, Interval, float]:
+        """Return (interval index, interval, remaining seconds) at `offset`."""
+        index = 0
+        if self.repeat > 1:
+            period = self.body_seconds + (
+                0 if self.rest is None else self.rest.get_time_seconds()
+            )
+            repetition = min(int(offset // period), self.repeat - 1)
+            offset -= repetition * period
+            index = repetition * (self.body_count + (self.rest is not None))
+            if offset >= self.body_seconds and repetition < self.repeat - 1:
+                return index + self.body_count, self.rest, period - offset
+
+        ends = self.ends
+        i = min(bisect_right(ends, offset), len(ends) - 1)
+        item = self.items[i]
+        if i:
+            index += self.counts[i - 1]
+        if isinstance(item, _Node):
+            start = ends[i - 1] if i else 0.0
+            j, interval, remaining = item.find(offset - start)
+            return index + j, interval, remaining
+        return index, item, ends[i] - offset
+
+    def leaf(self, index: int) -> Tuple[Interval, float]:
+        """Return the interval with flattened `index` and its start offset."""
+        start = 0.0
+        if self.repeat > 1:
+            has_rest = self.rest is not None
+            repetition, index = divmod(index, self.body_count + has_rest)
+            rest_seconds = self.rest.get_time_seconds() if has_rest else 0
+            start = repetition * (self.body_seconds + rest_seconds)
+            if index == self.body_count:
+                return self.rest, start + self.body_seconds
+
+        i = bisect_right(self.counts, index)
+        if i:
+            start += self.ends[i - 1]
+            index -= self.counts[i - 1]
+        item = self.items[i]
+        if isinstance(item, _Node):
+            interval, offset = item.leaf(index)
+            return interval, start + offset
+        return item, start
+
+
+class Schedule:
+    """Compiled timeline of a training.
+
+    Holds the prefix sums of the interval durations of one round in flat
+    arrays, one per block, so the state at any point in time is a divmod plus
+    a binary search per nesting level and never requires replaying (or even
+    expanding) the intervals. Memory use is proportional to the definition of
+    the training, not to the number of intervals it expands to.
+
+    Interval indexes count the intervals of one round as if all blocks were
+    expanded, including the rests between block repetitions.
+    """
+
+    __slots__ = ("_root", "_round_seconds", "_max_rounds")
+
+    def __init__(self, training: Training) -> None:
+        self._root: _Node = _Node(list(training.get_intervals()))
+        self._round_seconds: float = self._root.duration
+        self._max_rounds: Optional[int] = training.get_max_rounds()
+
+    def get_interval_count(self) -> int:
+        """Intervals per round, with all blocks expanded."""
+        return self._root.count
+
+    def get_interval(self, index: int) -> Interval:
+        if not 0 <= index < self._root.count:
+            raise IndexError("interval index out of range")
+        return self._root.leaf(index)[0]
+
+    def get_max_rounds(self) -> Optional[int]:
+        return self._max_rounds
+
+    def get_round_seconds(self) -> float:
+        return self._round_seconds
+
+    def get_total_seconds(self) -> Optional[float]:
+        if self._max_rounds is None:
+            return None
+        return self._round_seconds * self._max_rounds
+
+    def get_entry_count(self) -> Optional[int]:
+        if self._max_rounds is None:
+            return None
+        return self._root.count * self._max_rounds
+
+    def is_finished(self, elapsed: float) -> bool:
+        total = self.get_total_seconds()
+        return total is not None and elapsed >= total
+
+    def lookup(self, elapsed: float) -> Tuple[int, int, Interval, float]:
+        """Return (current round, interval index, interval, remaining seconds)."""
+        max_rounds = self._max_rounds
+        if max_rounds is not None and elapsed >= self._round_seconds * max_rounds:
+            index = self._root.count - 1
+            return max_rounds, index, self._root.leaf(index)[0], 0.0
+
+        current_round, offset = divmod(max(elapsed, 0.0), self._round_seconds)
+        index, interval, remaining = self._root.find(offset)
+        return int(current_round), index, interval, remaining
+
+    def locate(self, elapsed: float) -> Tuple[int, int, float]:
+        """Return (current round, interval index, remaining seconds) at `elapsed`."""
+        current_round, index, _, remaining = self.lookup(elapsed)
+        return current_round, index, remaining
+
+    def state_at(self, elapsed: float) -> TimelineState:
+        current_round, index, interval, remaining = self.lookup(elapsed)
+        return TimelineState(
+            current_round=current_round,
+            index=index,
+            interval=interval,
+            remaining=remaining,
+            finished=self.is_finished(elapsed),
+        )
+
+    def entries(self, offset: int = 0, limit: Optional[int] = None):
+        """Yield the flattened timeline from entry `offset`, at most `limit` entries."""
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+
+        stop = self.get_entry_count()
+        if limit is not None:
+            stop = offset + limit if stop is None else min(stop, offset + limit)
+
+        count = self._root.count
+        position = offset
+        while stop is None or position < stop:
+            current_round, index = divmod(position, count)
+            interval, start = self._root.leaf(index)
+            start += current_round * self._round_seconds
+            yield TimelineEntry(
+                position=position,
+                current_round=current_round,
+                index=index,
+                interval=interval,
+                start=start,
+                end=start + interval.get_time_seconds(),
+            )
+            position += 1
+
+
+def _whole_seconds(remaining: float) -> int:
+    # Whole seconds shown for `remaining`. An exact boundary already counts
+    # as the next second, so a wake-up scheduled on it sees the new value.
+    return max(math.ceil(remaining) - 1, 0)
+
+
+def event_key(event: WorkoutEvent) -> Tuple:
+    """Fields a display shows; events with equal keys render identically."""
+    return (
+        event.status,
+        event.current_round,
+        event.interval_name,
+        event.remaining_seconds,
+    )
+
+
+class DriftStats:
+    """Scheduled versus actual wake-up times of a timer.
+
+    Keeps running statistics of the lateness of every timed wake-up and an
+    exponentially weighted estimate of how much a sleep overshoots, which
+    `Workout.arun` subtracts from the next sleep so second changes land on
+    their boundaries.
+    """
+
+    __slots__ = ("count", "last", "total", "max", "estimate")
+
+    # weight of the newest sample in the estimate
+    SMOOTHING = 0.2
+    # never wake up more than this much early
+    MAX_COMPENSATION = 0.02
+
     def __init__(self) -> None:
+        self.count: int = 0
+        self.last: float = 0.0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.estimate: float = 0.0
+
+    def observe(self, lateness: float, oversleep: Optional[float] = None) -> None:
+        """Record a wake-up `lateness` seconds after its deadline.
+
+        `oversleep` is how much the sleep itself overshot; it differs from the
+        lateness once compensation shortens the sleeps. Defaults to `lateness`.
+        """
+        self.count += 1
+        self.last = lateness
+        self.total += lateness
+        self.max = max(self.max, abs(lateness))
+        if oversleep is None:
+            oversleep = lateness
+        self.estimate += self.SMOOTHING * (oversleep - self.estimate)
+
+    def get_mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def get_compensation(self) -> float:
+        return min(max(self.estimate, 0.0), self.MAX_COMPENSATION)
+
+
+class Workout:
+    __slots__ = (
+        "_clock",
+        "_state",
+        "_started_at",
+        "_paused_at",
+        "_paused_total",
+        "_changed",
+        "_condition",
+        "_version",
+    )
+
+    def __init__(self, clock: Optional[Clock] = None) -> None:
+        self._clock: Clock = clock or MONOTONIC_CLOCK
         self._state: WorkoutStatus = WorkoutStatus.STOPPED
+        # monotonic timestamps, only meaningful while running or paused
+        self._started_at: float = 0.0
+        self._paused_at: float = 0.0
+        self._paused_total: float = 0.0
+        # set (and replaced) on every control action to wake async runners
+        self._changed: Optional[asyncio.Event] = None
+        # created on demand for threads parked in `run`
+        self._condition: Optional[threading.Condition] = None
+        self._version: int = 0
 
     def stop(self) -> None:
         self._state = WorkoutStatus.STOPPED
+        self._paused_total = 0.0
+        self.notify()
 
     def start(self) -> None:
+        now = self._clock.now()
+        if self._state == WorkoutStatus.PAUSED:
+            self._paused_total += now - self._paused_at
+        elif self._state != WorkoutStatus.RUNNING:
+            self._started_at = now
+            self._paused_total = 0.0
         self._state = WorkoutStatus.RUNNING
+        self.notify()
 
     def pause(self) -> None:
-        self._state = WorkoutStatus.PAUSED
+        if self._state == WorkoutStatus.RUNNING:
+            self._paused_at = self._clock.now()
+            self._state = WorkoutStatus.PAUSED
+            self.notify()
+
+    def get_clock(self) -> Clock:
+        return self._clock
 
     def get_state(self) -> WorkoutStatus:
         return self._state
 
+    def get_record(self) -> WorkoutRecord:
+        return WorkoutRecord(
+            status=self._state,
+            started_at=self._started_at,
+            paused_at=self._paused_at,
+            paused_total=self._paused_total,
+        )
+
+    def restore(self, record: WorkoutRecord) -> None:
+        self._state = WorkoutStatus(record.status)
+        self._started_at = record.started_at
+        self._paused_at = record.paused_at
+        self._paused_total = record.paused_total
+        self.notify()
+
+    def notify(self) -> None:
+        """Wake every coroutine waiting in `arun` and thread parked in `run`."""
+        self._version += 1
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+        if self._condition is not None:
+            with self._condition:
+                self._condition.notify_all()
+
+    def _wait_handle(self) -> asyncio.Event:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def get_elapsed(self, now: float) -> Tuple[float, float]:
+        """Return (active seconds, paused seconds) since the workout started."""
+        paused = self._paused_total
+        if self._state == WorkoutStatus.PAUSED:
+            paused += now - self._paused_at
+        return now - self._started_at - paused, paused
+
+    def snapshot(self, schedule: Schedule) -> WorkoutEvent:
+        if self._state == WorkoutStatus.STOPPED:
+            first = schedule.get_interval(0)
+            return self._create_event(
+                schedule=schedule,
+                current_round=0,
+                index=0,
+                interval=first,
+                remaining=first.get_time_seconds(),
+                duration=0.0,
+                paused=0.0,
+            )
+
+        if self._state == WorkoutStatus.COMPLETED:
+            elapsed, paused = schedule.get_total_seconds(), self._paused_total
+        else:
+            elapsed, paused = self.get_elapsed(self._clock.now())
+            if schedule.is_finished(elapsed):
+                self._state = WorkoutStatus.COMPLETED
+                elapsed, paused = schedule.get_total_seconds(), self._paused_total
+
+        current_round, index, interval, remaining = schedule.lookup(elapsed)
+        return self._create_event(
+            schedule=schedule,
+            current_round=current_round,
+            index=index,
+            interval=interval,
+            remaining=remaining,
+            duration=elapsed + paused,
+            paused=paused,
+        )
+
+    def get_next_change(self, schedule: Schedule) -> Optional[float]:
+        """Seconds until the displayed state changes without any control action.
+
+        That is the next whole-second boundary of the remaining time, which also
+        covers the end of the current interval. None if the workout is idle.
+        """
+        if self._state != WorkoutStatus.RUNNING:
+            return None
+
+        elapsed, _ = self.get_elapsed(self._clock.now())
+        _, _, remaining = schedule.locate(elapsed)
+        return remaining - _whole_seconds(remaining)
+
     def run(self, training: Training):
-        # workout loop
-        paused_total: float = 0.0
-        duration_total: float = 0.0
+        """Yield the current state on every iteration.
+
+        While the workout is stopped, paused or completed the state cannot
+        change on its own, so the generator parks until the next control action
+        instead of yielding the same event again.
+        """
+        schedule = training.compile()
+        while True:
+            version = self._version
+            yield self.snapshot(schedule)
+            if self._state != WorkoutStatus.RUNNING:
+                self._park(version)
+
+    def _park(self, version: int) -> None:
+        if self._condition is None:
+            self._condition = threading.Condition()
+        with self._condition:
+            self._condition.wait_for(lambda: self._version != version)
+
+    async def arun(
+        self,
+        training: Training,
+        on_lateness: Optional[Callable[[float], None]] = None,
+        drift: Optional[DriftStats] = None,
+    ):
+        """Async counterpart of `run`.
+
+        Yields an event, then sleeps until the next second boundary or
+        interval end, or until a control action wakes it up. `on_lateness`
+        receives how many seconds each timed wake-up came after its deadline.
+        With `drift`, lateness is tracked there and the sleeps are shortened
+        by the expected lateness; an early wake-up waits out the remainder.
+        """
+        schedule = training.compile()
         while True:
-            if self._state == WorkoutStatus.STOPPED:
-                training.reset_all()
-                yield self._create_event(
-                    current_interval=training.get_current_interval(),
-                    training=training,
-                    duration=paused_total,
-                    paused=duration_total,
-                    status=self._state,
-                )
+            changed = self._wait_handle()
+            yield self.snapshot(schedule)
+            delay = self.get_next_change(schedule)
+            if delay is None:
+                await self._clock.wait(changed, None)
                 continue
 
-            if self._state == WorkoutStatus.COMPLETED:
-                yield self._create_event(
-                    current_interval=training.get_current_interval(),
-                    training=training,
-                    duration=duration_total,
-                    paused=paused_total,
-                    status=self._state,
-                )
+            now = self._clock.now()
+            deadline = now + delay
+            compensation = drift.get_compensation() if drift else 0.0
+            sleep = max(delay - compensation, 0.0)
+            if await self._clock.wait(changed, sleep):
                 continue
+            woke = self._clock.now()
+            if woke < deadline:
+                if await self._clock.wait(changed, deadline - woke):
+                    continue
 
-            paused_total = 0.0
-            duration_total = 0.0
-            start_time = time.time()
-            training.reset_all()
-
-            interval = training.get_current_interval()
-
-            while not training.is_finished():
-                if self._state == WorkoutStatus.STOPPED:
-                    break
-
-                interval.reset()
-                interval_remaining = interval.get_remaining_seconds()
-                last_tick = time.time()
-
-                while interval_remaining > 0:
-                    if self._state == WorkoutStatus.STOPPED:
-                        break
-
-                    now = time.time()
-                    delta = now - last_tick
-                    last_tick = now
-
-                    interval_remaining -= delta
-                    interval.set_remaining_seconds(interval_remaining)
-                    duration_total = time.time() - start_time
-                    yield self._create_event(
-                        current_interval=interval,
-                        training=training,
-                        duration=duration_total,
-                        paused=paused_total,
-                        status=self._state,
-                    )
-
-                interval = training.next_interval()
-                if training.is_finished():
-                    self._state = WorkoutStatus.COMPLETED
-
-            duration_total = time.time() - start_time
-            yield self._create_event(
-                current_interval=interval,
-                training=training,
-                duration=duration_total,
-                paused=paused_total,
-                status=self._state,
-            )
+            lateness = self._clock.now() - deadline
+            if drift is not None:
+                drift.observe(lateness, oversleep=woke - now - sleep)
+            if on_lateness is not None:
+                on_lateness(lateness)
 
     def _create_event(
         self,
-        current_interval: Interval,
-        training: Training,
+        schedule: Schedule,
+        current_round: int,
+        index: int,
+        interval: Interval,
+        remaining: float,
         duration: float,
         paused: float,
-        status: WorkoutStatus,
-    ) -> IntervalEvent:
-        hh, mm, ss = current_interval.get_remaining_hms()
-        return IntervalEvent(
-            interval_name=current_interval.get_name(),
-            remaining_seconds=int(current_interval.get_remaining_seconds()),
-            remaining_hh=hh,
-            remaining_mm=mm,
-            remaining_ss=ss,
-            current_round=training._current_round,
-            max_rounds=training.get_max_rounds(),
+    ) -> WorkoutEvent:
+        if self._state == WorkoutStatus.STOPPED:
+            # idle, the full first interval is shown
+            remaining_seconds = int(remaining)
+        else:
+            remaining_seconds = _whole_seconds(remaining)
+        return WorkoutEvent(
+            interval_name=interval.get_name(),
+            interval_index=index,
+            remaining_seconds=remaining_seconds,
+            remaining_hh=remaining_seconds // 3600,
+            remaining_mm=(remaining_seconds % 3600) // 60,
+            remaining_ss=remaining_seconds % 60,
+            current_round=current_round,
+            max_rounds=schedule.get_max_rounds(),
             duration=duration,
             paused=paused,
-            status=status,
+            status=self._state,
+        )
+
+
+def simulate(
+    training: Training,
+    resolution: float = 1.0,
+    max_seconds: Optional[float] = None,
+) -> Iterator[WorkoutEvent]:
+    """Event trace of an uninterrupted run of `training`, computed without waiting.
+
+    Emits one event every `resolution` seconds of workout time plus one at
+    every interval switch, followed by a COMPLETED event when the training
+    finishes within `max_seconds`. Unbounded trainings need `max_seconds`.
+    """
+    if resolution <= 0:
+        raise ValueError("resolution must be positive")
+
+    schedule = training.compile()
+    total = schedule.get_total_seconds()
+    if total is None and max_seconds is None:
+        raise ValueError("max_seconds must be provided for unbounded trainings")
+
+    end = total if max_seconds is None else min(max_seconds, total or max_seconds)
+    return _simulate(schedule, resolution, end, end == total)
+
+
+def _simulate(
+    schedule: Schedule, resolution: float, end: float, completes: bool
+) -> Iterator[WorkoutEvent]:
+    max_rounds = schedule.get_max_rounds()
+    running = WorkoutStatus.RUNNING
+
+    for entry in schedule.entries():
+        if entry.start >= end:
+            break
+
+        name = entry.interval.get_name()
+        stop = min(entry.end, end)
+        # the interval switch itself, then every grid point inside the interval
+        step = math.ceil(entry.start / resolution)
+        t = entry.start
+        while t < stop:
+            seconds = _whole_seconds(entry.end - t)
+            yield WorkoutEvent(
+                name,
+                entry.index,
+                running,
+                seconds,
+                seconds // 3600,
+                (seconds % 3600) // 60,
+                seconds % 60,
+                entry.current_round,
+                max_rounds,
+                t,
+                0.0,
+            )
+            if step * resolution <= t:
+                step += 1
+            t = step * resolution
+
+    if completes:
+        index = schedule.get_interval_count() - 1
+        yield WorkoutEvent(
+            schedule.get_interval(index).get_name(),
+            index,
+            WorkoutStatus.COMPLETED,
+            0,
+            0,
+            0,
+            0,
+            max_rounds,
+            max_rounds,
+            end,
+            0.0,
         )
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional, TextIO
+
+from app.core import Workout, WorkoutRecord
+
+
+class Journal:
+    """Append-only JSON-lines journal of session state for crash recovery.
+
+    Records are buffered in memory and written by a background task that
+    fsyncs once per batch, so recording never waits on the disk. The folded
+    latest state of every session is kept alongside; once the file holds at
+    least `compact_after` records and twice as many as the folded state, it
+    is rewritten from it.
+
+    Timer timestamps are stored as wall-clock time, since monotonic clocks do
+    not survive a restart.
+    """
+
+    def __init__(
+        self, path: str, flush_seconds: float = 0.05, compact_after: int = 1000
+    ) -> None:
+        self._path: str = path
+        self._flush_seconds: float = flush_seconds
+        self._compact_after: int = compact_after
+        self._sessions: Dict[str, dict] = {}
+        self._pending: List[str] = []
+        self._appended: int = 0
+        self._file: Optional[TextIO] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing: asyncio.Event = asyncio.Event()
+
+    def load(self) -> Dict[str, dict]:
+        """
+        Read the journal and return the latest state of every session.
+
+        A torn last line, left by a crash in the middle of a write, is cut
+        off so records appended later start on a line of their own.
+        """
+        self._sessions = {}
+        self._appended = 0
+        try:
+            with open(self._path, "rb+") as f:
+                end = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    end += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._apply(record)
+                    self._appended += 1
+                f.truncate(end)
+        except FileNotFoundError:
+            pass
+        return self._sessions
+
+    def record_training(self, session_id: str, training: dict) -> None:
+        self._append({"type": "training", "session": session_id, "training": training})
+
+    def record_timer(self, session_id: str, workout: Workout) -> None:
+        record = workout.get_record()
+        offset = time.time() - workout.get_clock().now()
+        timer = {
+            "status": record.status.value,
+            "started_at": record.started_at + offset,
+            "paused_at": record.paused_at + offset,
+            "paused_total": record.paused_total,
+        }
+        self._append({"type": "timer", "session": session_id, "timer": timer})
+
+    def record_delete(self, session_id: str) -> None:
+        self._append({"type": "delete", "session": session_id})
+
+    @staticmethod
+    def restore_timer(workout: Workout, timer: dict) -> None:
+        offset = time.time() - workout.get_clock().now()
+        workout.restore(
+            WorkoutRecord(
+                status=timer["status"],
+                started_at=timer["started_at"] - offset,
+                paused_at=timer["paused_at"] - offset,
+                paused_total=timer["paused_total"],
+            )
+        )
+
+    async def start(self) -> None:
+        self._file = open(self._path, "a")
+        self._closing.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._closing.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def flush(self) -> None:
+        if not self._pending or self._file is None:
+            return
+
+        lines, self._pending = self._pending, []
+        self._appended += len(lines)
+        # relative to the folded state, or a large one is rewritten every flush
+        folded = sum(len(state) for state in self._sessions.values())
+        if self._appended >= max(self._compact_after, 2 * folded):
+            snapshot = self._snapshot()
+            await asyncio.to_thread(self._rewrite, snapshot)
+            self._appended = len(snapshot)
+        else:
+            await asyncio.to_thread(self._write, lines)
+
+    async def _run(self) -> None:
+        while not self._closing.is_set():
+            try:
+                await asyncio.wait_for(self._closing.wait(), self._flush_seconds)
+            except TimeoutError:
+                pass
+            await self.flush()
+
+    def _append(self, record: dict) -> None:
+        self._apply(record)
+        self._pending.append(json.dumps(record))
+
+    def _apply(self, record: dict) -> None:
+        session_id = record["session"]
+        if record["type"] == "delete":
+            self._sessions.pop(session_id, None)
+            return
+        self._sessions.setdefault(session_id, {})[record["type"]] = record[
+            record["type"]
+        ]
+
+    def _snapshot(self) -> List[str]:
+        lines = []
+        for session_id, state in self._sessions.items():
+            for kind, value in state.items():
+                lines.append(
+                    json.dumps({"type": kind, "session": session_id, kind: value})
+                )
+        return lines
+
+    def _write(self, lines: List[str]) -> None:
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _rewrite(self, lines: List[str]) -> None:
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w") as f:
+            if lines:
+                f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path)
+        self._file.close()
+        self._file = open(self._path, "a")
@@ -0,0 +1,268 @@
+"""Library of saved trainings, stored in SQLite.
+
+Entries keep the training definition as JSON next to indexed name, owner
+and tag columns. Listing uses keyset pagination on the entry id, so every
+page is an index range scan no matter how deep the cursor is. Converted
+and compiled `Training` objects of recently used entries are kept in a
+bounded LRU cache; a cache hit costs a single primary key lookup to check
+that the entry was not changed since (possibly by another process).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from app.core import Training
+from app.model import TrainingCreate
+from app.util import to_model
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trainings (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    owner TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT '[]',
+    version INTEGER NOT NULL DEFAULT 1,
+    definition TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trainings_name ON trainings (name, id);
+CREATE INDEX IF NOT EXISTS trainings_owner ON trainings (owner, id);
+CREATE TABLE IF NOT EXISTS training_tags (
+    tag TEXT NOT NULL,
+    training_id INTEGER NOT NULL REFERENCES trainings (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, training_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS training_tags_training ON training_tags (training_id);
+"""
+
+_COLUMNS = "trainings.id, name, owner, tags, version, definition, updated_at"
+
+
+class VersionConflictError(ValueError):
+    """The entry was changed since the version the caller based an update on."""
+
+
+class LibraryEntry(NamedTuple):
+    id: int
+    name: str
+    owner: str
+    tags: Tuple[str, ...]
+    version: int
+    training: TrainingCreate
+    updated_at: float
+
+
+class CachedTraining(NamedTuple):
+    version: int
+    payload: TrainingCreate
+    training: Training
+
+
+def _to_entry(row: tuple) -> LibraryEntry:
+    entry_id, name, owner, tags, version, definition, updated_at = row
+    return LibraryEntry(
+        id=entry_id,
+        name=name,
+        owner=owner,
+        tags=tuple(json.loads(tags)),
+        version=version,
+        training=TrainingCreate.model_validate_json(definition),
+        updated_at=updated_at,
+    )
+
+
+class Library:
+    def __init__(self, path: str = ":memory:", cache_size: int = 256) -> None:
+        if cache_size < 0:
+            raise ValueError("cache_size must not be negative")
+
+        self._db: sqlite3.Connection = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[int, CachedTraining] = OrderedDict()
+        self._cache_size: int = cache_size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM trainings").fetchone()[0]
+
+    def create(
+        self, payload: TrainingCreate, owner: str = "", tags: Iterable[str] = ()
+    ) -> LibraryEntry:
+        return self.create_many([(payload, owner, tags)])[0]
+
+    def create_many(
+        self, items: Iterable[Tuple[TrainingCreate, str, Iterable[str]]]
+    ) -> List[LibraryEntry]:
+        """Store several trainings in one transaction."""
+        now = time.time()
+        entries = []
+        with self._lock, self._db:
+            for payload, owner, tags in items:
+                tags = tuple(dict.fromkeys(tags))
+                cursor = self._db.execute(
+                    "INSERT INTO trainings (name, owner, tags, definition, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (
+                        payload.name,
+                        owner,
+                        json.dumps(tags),
+                        payload.model_dump_json(),
+                        now,
+                    ),
+                )
+                entry_id = cursor.lastrowid
+                self._db.executemany(
+                    "INSERT INTO training_tags (tag, training_id) VALUES (?, ?)",
+                    [(tag, entry_id) for tag in tags],
+                )
+                entries.append(
+                    LibraryEntry(entry_id, payload.name, owner, tags, 1, payload, now)
+                )
+        return entries
+
+    def get(self, entry_id: int) -> Optional[LibraryEntry]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM trainings WHERE id = ?", (entry_id,)
+            ).fetchone()
+        return None if row is None else _to_entry(row)
+
+    def update(
+        self,
+        entry_id: int,
+        payload: TrainingCreate,
+        owner: str = "",
+        tags: Iterable[str] = (),
+        version: Optional[int] = None,
+    ) -> Optional[LibraryEntry]:
+        """
+        Replace an entry and bump its version.
+
+        If `version` is given the update only applies to that version of the
+        entry, otherwise VersionConflictError is raised.
+        """
+        tags = tuple(dict.fromkeys(tags))
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT version FROM trainings WHERE id = ?", (entry_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if version is not None and row[0] != version:
+                raise VersionConflictError(
+                    f"entry {entry_id} is at version {row[0]}, not {version}"
+                )
+            self._db.execute(
+                "UPDATE trainings SET name = ?, owner = ?, tags = ?, definition = ?,"
+                " version = version + 1, updated_at = ? WHERE id = ?",
+                (
+                    payload.name,
+                    owner,
+                    json.dumps(tags),
+                    payload.model_dump_json(),
+                    now,
+                    entry_id,
+                ),
+            )
+            self._db.execute(
+                "DELETE FROM training_tags WHERE training_id = ?", (entry_id,)
+            )
+            self._db.executemany(
+                "INSERT INTO training_tags (tag, training_id) VALUES (?, ?)",
+                [(tag, entry_id) for tag in tags],
+            )
+            self._cache.pop(entry_id, None)
+        return LibraryEntry(
+            entry_id, payload.name, owner, tags, row[0] + 1, payload, now
+        )
+
+    def delete(self, entry_id: int) -> bool:
+        with self._lock, self._db:
+            cursor = self._db.execute("DELETE FROM trainings WHERE id = ?", (entry_id,))
+            self._cache.pop(entry_id, None)
+        return cursor.rowcount > 0
+
+    def list(
+        self,
+        name: Optional[str] = None,
+        owner: Optional[str] = None,
+        tag: Optional[str] = None,
+        cursor: Optional[int] = None,
+        limit: int = 100,
+    ) -> Tuple[List[LibraryEntry], Optional[int]]:
+        """
+        One page of entries ordered by id, plus the cursor of the next page.
+
+        The cursor is the id of the last entry of the previous page; None
+        starts at the beginning and is returned once there are no more pages.
+        """
+        if limit < 1:
+            raise ValueError("limit must be positive")
+
+        query = f"SELECT {_COLUMNS} FROM trainings"
+        conditions = ["trainings.id > ?"]
+        params: list = [cursor if cursor is not None else 0]
+        if tag is not None:
+            query += " JOIN training_tags ON training_tags.training_id = trainings.id"
+            conditions.append("training_tags.tag = ?")
+            params.append(tag)
+        if name is not None:
+            conditions.append("name = ?")
+            params.append(name)
+        if owner is not None:
+            conditions.append("owner = ?")
+            params.append(owner)
+        query += f" WHERE {' AND '.join(conditions)} ORDER BY trainings.id LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        entries = [_to_entry(row) for row in rows[:limit]]
+        next_cursor = entries[-1].id if len(rows) > limit else None
+        return entries, next_cursor
+
+    def get_training(self, entry_id: int) -> Optional[CachedTraining]:
+        """Ready to run (converted and compiled) training of an entry."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT version FROM trainings WHERE id = ?", (entry_id,)
+            ).fetchone()
+            if row is None:
+                self._cache.pop(entry_id, None)
+                return None
+            cached = self._cache.get(entry_id)
+            if cached is not None and cached.version == row[0]:
+                self._cache.move_to_end(entry_id)
+                return cached
+
+        entry = self.get(entry_id)
+        if entry is None:
+            return None
+        training = to_model(entry.training)
+        training.compile()
+        cached = CachedTraining(entry.version, entry.training, training)
+        if self._cache_size:
+            with self._lock:
+                self._cache[entry_id] = cached
+                self._cache.move_to_end(entry_id)
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return cached
+
+    def get_cache_size(self) -> int:
+        return len(self._cache)
+
+    def close(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._db.close()
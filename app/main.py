@@ -1,26 +1,86 @@
-from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import StreamingResponse
 import asyncio
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, nullcontext
+from functools import lru_cache
+from typing import Annotated, Optional
 
+from fastapi import (
+    FastAPI,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from pydantic import ValidationError
 
 
-from app.core import Interval, Workout, Training
+from app.bulk import MEDIA_TYPES, Importer, LineSplitter, export_trainings
+from app.config import Settings
+from app.core import Interval, Training, simulate
+from app.journal import Journal
+from app.library import Library, VersionConflictError
+from app.metrics import CONTROL_LATENCY, REGISTRY, CallbackGauge
 from app.model import (
+    BulkImportError,
+    BulkImportResponse,
+    DriftResponse,
+    IntervalEvent,
+    LibraryEntryResponse,
+    LibraryPageResponse,
+    LibraryTrainingCreate,
+    LibraryTrainingUpdate,
+    TimelineResponse,
     TrainingCreate,
     TrainingResponse,
     UpdateWorkoutRequest,
     WorkoutAction,
     WorkoutResponse,
+    WorkoutStatus,
+)
+from app.serializer import encode_event
+from app.session import Session, SessionLimitError, SessionRegistry
+from app.shared import SharedSessionSync, SharedWorkoutState
+from app.util import (
+    to_drift_resp,
+    to_library_entry_resp,
+    to_model,
+    to_timeline_resp,
+    to_training_create,
+    to_training_resp,
 )
-from app.util import to_model, to_training_resp
+
+DEFAULT_SESSION = "default"
+
+SessionId = Annotated[str, Path(pattern=r"^[A-Za-z0-9_-]{1,64}$")]
+Offset = Annotated[int, Query(ge=0)]
+Limit = Annotated[int, Query(ge=1, le=1000)]
+EntryId = Annotated[int, Path(ge=1)]
+
+Encoding = Annotated[str, Query(pattern="^(json|binary)$")]
+LastEventId = Annotated[Optional[str], Header()]
+BulkFormat = Annotated[str, Query(pattern="^(ndjson|csv)$")]
+# throttle of a stream client, in updates per second; the timer itself changes
+# at most once a second, so there is nothing to gain above 1
+Hz = Annotated[Optional[float], Query(gt=0, le=1)]
+
+TEMPLATES_DIR = "templates"
+STATIC_DIR = "static"
+
+# events per chunk written to a simulation stream
+SIMULATION_CHUNK_SIZE = 1000
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup
+    settings = Settings.from_env()
     training = Training(
         name="My Workout",
         intervals=[
@@ -29,45 +89,167 @@ async def lifespan(app: FastAPI):
         ],
         max_rounds=10,
     )
-    app.state.training = training
 
-    # Create a single shared Workout timer
-    app.state.timer = Workout()
+    journal = None
+    if settings.journal_path:
+        journal = Journal(
+            settings.journal_path,
+            flush_seconds=settings.journal_flush_seconds,
+            compact_after=settings.journal_compact_after,
+        )
+    app.state.journal = journal
+    app.state.library = Library(
+        settings.library_path, cache_size=settings.library_cache_size
+    )
+
+    def forget_session(session: Session) -> None:
+        if journal is not None:
+            journal.record_delete(session.get_id())
+
+    # Every session starts with the same (immutable) default training
+    app.state.sessions = SessionRegistry(
+        training,
+        max_sessions=settings.max_sessions,
+        ttl_seconds=settings.session_ttl_seconds,
+        heartbeat_seconds=settings.heartbeat_seconds,
+        retry_seconds=settings.retry_seconds,
+        on_evict=forget_session,
+    )
+    app.state.sessions.pin(DEFAULT_SESSION)
+    register_session_metrics(app.state.sessions)
+
+    if journal is not None:
+        # Rebuild the sessions that were in progress before the restart
+        for session_id, state in journal.load().items():
+            session = app.state.sessions.get(session_id)
+            if "training" in state:
+                payload = TrainingCreate.model_validate(state["training"])
+                session.set_training(to_model(payload))
+            if "timer" in state:
+                journal.restore_timer(session.get_timer(), state["timer"])
+        await journal.start()
+
+    # Workers of one host share the default session's workout
+    shared = None
+    if settings.shared_state_name:
+        shared = SharedSessionSync(
+            SharedWorkoutState(
+                settings.shared_state_name, capacity=settings.shared_state_capacity
+            ),
+            app.state.sessions.get(DEFAULT_SESSION),
+            poll_seconds=settings.shared_poll_seconds,
+        )
+        shared.start()
+    app.state.shared = shared
 
     yield
-    # shutdown (cleanup if needed)
+    # shutdown
+    if shared is not None:
+        await shared.close()
+    for session in list(app.state.sessions.sessions()):
+        await session.get_broadcaster().close()
+    if journal is not None:
+        await journal.close()
+    app.state.library.close()
 
 
-app = FastAPI(lifespan=lifespan)
+class LazyStaticFiles:
+    """StaticFiles built on the first request instead of at import time."""
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+    def __init__(self, directory: str) -> None:
+        self._directory: str = directory
+        self._app: Optional[StaticFiles] = None
 
+    async def __call__(self, scope, receive, send) -> None:
+        if self._app is None:
+            self._app = StaticFiles(directory=self._directory)
+        await self._app(scope, receive, send)
 
-@app.get("/")
-async def home(request: Request):
-    return templates.TemplateResponse(request, "index.html", {"request": request})
 
+@lru_cache(maxsize=1)
+def render_index() -> bytes:
+    """The start page, rendered once; it does not depend on the request."""
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
 
-@app.post("/training", response_model=TrainingResponse)
-async def create_training(payload: TrainingCreate):
-    training = to_model(payload)
-    app.state.training = training
-    return to_training_resp(training)
+    environment = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR), autoescape=select_autoescape()
+    )
+    return environment.get_template("index.html").render().encode()
 
 
-@app.get("/training", response_model=TrainingResponse)
-async def get_training():
-    return to_training_resp(app.state.training)
+app = FastAPI(lifespan=lifespan)
 
+# Jinja2 and the static files app are only set up once a browser asks for them
+app.mount("/static", LazyStaticFiles(STATIC_DIR), name="static")
 
-@app.post("/timer", response_model=WorkoutResponse)
-async def update_timer(request: UpdateWorkoutRequest):
+
+def register_session_metrics(sessions: SessionRegistry) -> None:
+    def workouts_by_state():
+        counts = Counter(s.get_timer().get_state().value for s in sessions.sessions())
+        return {state.value: counts[state.value] for state in WorkoutStatus}
+
+    REGISTRY.register(
+        CallbackGauge(
+            "interval_timer_sessions", "Sessions in memory.", lambda: len(sessions)
+        )
+    )
+    REGISTRY.register(
+        CallbackGauge(
+            "interval_timer_subscribers",
+            "Streams attached to a workout.",
+            lambda: sum(
+                s.get_broadcaster().get_subscriber_count() for s in sessions.sessions()
+            ),
+        )
+    )
+    REGISTRY.register(
+        CallbackGauge(
+            "interval_timer_workouts",
+            "Workouts per state.",
+            workouts_by_state,
+            label="state",
+        )
+    )
+
+
+def get_session(session_id: str) -> Session:
     try:
-        # Convert string to enum (case-insensitive)
-        action = WorkoutAction[request.action.upper()]
-        timer = app.state.timer
+        return app.state.sessions.get(session_id)
+    except SessionLimitError:
+        raise HTTPException(status_code=503, detail="Too many active sessions")
+
+
+def shared_update(session: Session):
+    """
+    Context of a change to `session`, yielding its SharedSessionSync if any.
+
+    The default session is shared by all workers: the change is applied on
+    top of their latest state and published while holding the writers' lock.
+    """
+    if app.state.shared is None or session.get_id() != DEFAULT_SESSION:
+        return nullcontext()
+    return app.state.shared.update()
+
+
+def create_training(
+    session: Session, payload: TrainingCreate, training: Optional[Training] = None
+) -> TrainingResponse:
+    if training is None:
+        training = to_model(payload)
+    with shared_update(session) as shared:
+        session.set_training(training)
+        if shared is not None:
+            shared.publish_training(payload)
+    if app.state.journal is not None:
+        app.state.journal.record_training(
+            session.get_id(), payload.model_dump(mode="json")
+        )
+    return to_training_resp(training)
+
 
+def apply_action(session: Session, action: WorkoutAction) -> None:
+    timer = session.get_timer()
+    with shared_update(session) as shared:
         if action == WorkoutAction.START:
             timer.start()
         elif action == WorkoutAction.STOP:
@@ -75,28 +257,390 @@ async def update_timer(request: UpdateWorkoutRequest):
         elif action == WorkoutAction.PAUSE:
             timer.pause()
         else:
-            raise HTTPException(status_code=400, detail="Invalid action")
+            raise ValueError("Invalid action")
+        if shared is not None:
+            shared.publish_timer()
+
+    # streams see the new state before the caller gets a response
+    session.get_broadcaster().publish()
+    if app.state.journal is not None:
+        app.state.journal.record_timer(session.get_id(), timer)
+
+
+def update_timer(session: Session, request: UpdateWorkoutRequest) -> WorkoutResponse:
+    started = time.perf_counter()
+    try:
+        # Convert string to enum (case-insensitive)
+        action = WorkoutAction[request.action.upper()]
+        timer = session.get_timer()
+        apply_action(session, action)
 
     except KeyError:
         # This will trigger if the string doesn't match any enum member
         raise HTTPException(status_code=400, detail="Invalid action")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid action")
 
+    CONTROL_LATENCY.observe(time.perf_counter() - started)
     return WorkoutResponse(status=timer.get_state())
 
 
-@app.get("/workout")
-async def interval_events():
+async def start_saved_training(session: Session, entry_id: int) -> WorkoutResponse:
+    saved = await run_in_threadpool(app.state.library.get_training, entry_id)
+    if saved is None:
+        raise HTTPException(status_code=404, detail="Training not found")
+
+    create_training(session, saved.payload, saved.training)
+    apply_action(session, WorkoutAction.STOP)
+    apply_action(session, WorkoutAction.START)
+    return WorkoutResponse(status=session.get_timer().get_state())
+
+
+async def workout_socket(websocket: WebSocket, session: Session, encoding: str) -> None:
+    """
+    Serve state updates and accept control actions over one WebSocket.
+
+    Actions are JSON text messages like {"action": "start"}. Updates are
+    IntervalEvent JSON text frames, or with encoding=binary, fixed-layout
+    binary frames (see app.serializer.BINARY_EVENT).
+    """
+    await websocket.accept()
+    broadcaster = session.get_broadcaster()
+    subscriber = broadcaster.subscribe()
+
+    async def send_updates():
+        while True:
+            frame = await subscriber.get()
+            if frame is None:
+                # the session was removed
+                await websocket.close()
+                return
+            if encoding == "binary":
+                await websocket.send_bytes(frame.binary())
+            else:
+                await websocket.send_text(frame.json().decode())
+
+    async def receive_actions():
+        while True:
+            message = await websocket.receive_text()
+            try:
+                request = UpdateWorkoutRequest.model_validate_json(message)
+            except ValidationError:
+                await websocket.send_json({"detail": "Invalid action"})
+                continue
+            apply_action(session, request.action)
+
+    tasks = [
+        asyncio.create_task(send_updates()),
+        asyncio.create_task(receive_actions()),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        broadcaster.unsubscribe(subscriber)
+
+
+def stream_workout(
+    session: Session, last_event_id: Optional[str] = None, hz: Optional[float] = None
+) -> StreamingResponse:
+    # an unknown id (e.g. from before a restart) just gets the current state
+    return StreamingResponse(
+        session.get_broadcaster().stream(last_event_id, hz),
+        media_type="text/event-stream",
+    )
+
+
+@app.get("/", response_class=HTMLResponse)
+async def home():
+    return HTMLResponse(render_index())
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Metrics in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.post("/training", response_model=TrainingResponse)
+async def create_default_training(payload: TrainingCreate):
+    return create_training(get_session(DEFAULT_SESSION), payload)
+
+
+@app.get("/training", response_model=TrainingResponse)
+async def get_default_training():
+    return to_training_resp(get_session(DEFAULT_SESSION).get_training())
+
+
+@app.get("/training/timeline", response_model=TimelineResponse)
+async def get_default_timeline(offset: Offset = 0, limit: Limit = 100):
+    """
+    Flattened timeline of the training, one entry per interval and round.
+    """
+    training = get_session(DEFAULT_SESSION).get_training()
+    return to_timeline_resp(training, offset, limit)
+
+
+@app.post("/training/simulate")
+async def simulate_training(
+    payload: TrainingCreate,
+    resolution: Annotated[float, Query(ge=0.01, le=3600)] = 1.0,
+    max_seconds: Annotated[Optional[float], Query(gt=0)] = None,
+):
+    """
+    Full event trace of the training as NDJSON, one IntervalEvent per line.
+    """
+    try:
+        events = simulate(to_model(payload), resolution, max_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def ndjson():
+        chunk = []
+        for event in events:
+            chunk.append(encode_event(event))
+            if len(chunk) == SIMULATION_CHUNK_SIZE:
+                yield b"\n".join(chunk) + b"\n"
+                chunk.clear()
+        if chunk:
+            yield b"\n".join(chunk) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/timer", response_model=WorkoutResponse)
+async def update_default_timer(request: UpdateWorkoutRequest):
+    return update_timer(get_session(DEFAULT_SESSION), request)
+
+
+# /workout streams IntervalEvent JSON; document it even though the stream
+# bypasses pydantic serialization
+WORKOUT_STREAM_RESPONSES = {
+    200: {
+        "description": "Server-sent events, one IntervalEvent per `data:` line",
+        "content": {"text/event-stream": {"schema": IntervalEvent.model_json_schema()}},
+    }
+}
+
+
+@app.get("/workout", responses=WORKOUT_STREAM_RESPONSES)
+async def interval_events(last_event_id: LastEventId = None, hz: Hz = None):
     """
     SSE endpoint streaming interval timer updates.
+
+    Reconnecting clients send the id of the last event they received in the
+    `Last-Event-ID` header and only get what they missed. `hz` (at most 1)
+    throttles updates of an unchanged status, e.g. `hz=0.2` for a display
+    that only needs a refresh every five seconds; status changes are sent
+    right away. A client that can't keep up always gets the newest state
+    and never a backlog.
+    """
+    return stream_workout(get_session(DEFAULT_SESSION), last_event_id, hz)
+
+
+@app.get("/drift", response_model=DriftResponse)
+async def get_default_drift():
+    """
+    Lateness of the timer wake-ups against their scheduled second boundaries.
+    """
+    return to_drift_resp(get_session(DEFAULT_SESSION).get_broadcaster().get_drift())
+
+
+@app.websocket("/ws/workout")
+async def workout_websocket(websocket: WebSocket, encoding: Encoding = "json"):
+    await workout_socket(websocket, get_session(DEFAULT_SESSION), encoding)
+
+
+@app.post("/sessions/{session_id}/training", response_model=TrainingResponse)
+async def create_session_training(session_id: SessionId, payload: TrainingCreate):
+    return create_training(get_session(session_id), payload)
+
+
+@app.get("/sessions/{session_id}/training", response_model=TrainingResponse)
+async def get_session_training(session_id: SessionId):
+    return to_training_resp(get_session(session_id).get_training())
+
+
+@app.get("/sessions/{session_id}/training/timeline", response_model=TimelineResponse)
+async def get_session_timeline(
+    session_id: SessionId, offset: Offset = 0, limit: Limit = 100
+):
+    training = get_session(session_id).get_training()
+    return to_timeline_resp(training, offset, limit)
+
+
+@app.post("/sessions/{session_id}/timer", response_model=WorkoutResponse)
+async def update_session_timer(session_id: SessionId, request: UpdateWorkoutRequest):
+    return update_timer(get_session(session_id), request)
+
+
+@app.get("/sessions/{session_id}/workout", responses=WORKOUT_STREAM_RESPONSES)
+async def session_interval_events(
+    session_id: SessionId, last_event_id: LastEventId = None, hz: Hz = None
+):
+    """
+    SSE endpoint streaming interval timer updates of a single session.
+    """
+    return stream_workout(get_session(session_id), last_event_id, hz)
+
+
+@app.get("/sessions/{session_id}/drift", response_model=DriftResponse)
+async def get_session_drift(session_id: SessionId):
+    return to_drift_resp(get_session(session_id).get_broadcaster().get_drift())
+
+
+@app.websocket("/sessions/{session_id}/ws")
+async def session_workout_websocket(
+    websocket: WebSocket, session_id: SessionId, encoding: Encoding = "json"
+):
+    await workout_socket(websocket, get_session(session_id), encoding)
+
+
+@app.delete("/sessions/{session_id}", status_code=204)
+async def delete_session(session_id: SessionId):
+    if session_id == DEFAULT_SESSION:
+        raise HTTPException(status_code=400, detail="Default session can't be removed")
+
+    session = app.state.sessions.remove(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if app.state.journal is not None:
+        app.state.journal.record_delete(session_id)
+    await session.get_broadcaster().close()
+
+
+@app.post("/library", response_model=LibraryEntryResponse, status_code=201)
+async def create_library_entry(payload: LibraryTrainingCreate):
+    training = to_training_create(payload)
+    entry = await run_in_threadpool(
+        app.state.library.create, training, payload.owner, payload.tags
+    )
+    return to_library_entry_resp(entry)
+
+
+@app.get("/library", response_model=LibraryPageResponse)
+async def list_library_entries(
+    name: Optional[str] = None,
+    owner: Optional[str] = None,
+    tag: Optional[str] = None,
+    cursor: Annotated[Optional[int], Query(ge=0)] = None,
+    limit: Limit = 100,
+):
+    """
+    Saved trainings ordered by id, optionally filtered by name, owner and tag.
+
+    Pass `next_cursor` of a page as `cursor` to get the following page.
+    """
+    entries, next_cursor = await run_in_threadpool(
+        app.state.library.list, name, owner, tag, cursor, limit
+    )
+    return LibraryPageResponse(
+        entries=[to_library_entry_resp(e) for e in entries], next_cursor=next_cursor
+    )
+
+
+@app.post("/library/import", response_model=BulkImportResponse)
+async def import_library_entries(request: Request, format: BulkFormat = "ndjson"):
+    """
+    Import trainings from an NDJSON or CSV request body (see app.bulk).
+
+    The body is read and stored incrementally. Invalid trainings are skipped
+    and reported by line number; all valid ones are imported.
+    """
+    importer = Importer(app.state.library, format)
+    splitter = LineSplitter()
+
+    def add(lines):
+        for line in lines:
+            importer.add(line)
+
+    # validation and SQLite writes run off the event loop the timers tick on
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(add, splitter.feed(chunk))
+        await run_in_threadpool(add, splitter.close())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result = await run_in_threadpool(importer.close)
+    return BulkImportResponse(
+        imported=result.imported,
+        failed=result.failed,
+        errors=[BulkImportError(line=e.line, error=e.error) for e in result.errors],
+    )
+
+
+@app.get("/library/export")
+async def export_library_entries(
+    format: BulkFormat = "ndjson",
+    name: Optional[str] = None,
+    owner: Optional[str] = None,
+    tag: Optional[str] = None,
+):
     """
-    # Example training setup
+    Stream saved trainings in the import format, optionally filtered.
+
+    CSV has no notion of blocks, trainings with blocks are only exported as
+    NDJSON.
+    """
+    return StreamingResponse(
+        export_trainings(app.state.library, format, name, owner, tag),
+        media_type=MEDIA_TYPES[format],
+    )
 
-    training = app.state.training
 
-    async def event_generator():
-        for event in app.state.timer.run(training=training):
-            # SSE format
-            yield f"data: {event.model_dump_json()}\n\n"
-            await asyncio.sleep(0.1)  # control update frequency
+@app.get("/library/{entry_id}", response_model=LibraryEntryResponse)
+async def get_library_entry(entry_id: EntryId):
+    entry = await run_in_threadpool(app.state.library.get, entry_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Training not found")
+    return to_library_entry_resp(entry)
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+@app.put("/library/{entry_id}", response_model=LibraryEntryResponse)
+async def update_library_entry(entry_id: EntryId, payload: LibraryTrainingUpdate):
+    training = to_training_create(payload)
+    try:
+        entry = await run_in_threadpool(
+            app.state.library.update,
+            entry_id,
+            training,
+            payload.owner,
+            payload.tags,
+            payload.version,
+        )
+    except VersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Training not found")
+    return to_library_entry_resp(entry)
+
+
+@app.delete("/library/{entry_id}", status_code=204)
+async def delete_library_entry(entry_id: EntryId):
+    if not await run_in_threadpool(app.state.library.delete, entry_id):
+        raise HTTPException(status_code=404, detail="Training not found")
+
+
+@app.post("/library/{entry_id}/start", response_model=WorkoutResponse)
+async def start_library_entry(entry_id: EntryId):
+    """
+    Load a saved training into the default session and start it from the top.
+    """
+    return await start_saved_training(get_session(DEFAULT_SESSION), entry_id)
+
+
+@app.post(
+    "/sessions/{session_id}/library/{entry_id}/start", response_model=WorkoutResponse
+)
+async def start_session_library_entry(session_id: SessionId, entry_id: EntryId):
+    return await start_saved_training(get_session(session_id), entry_id)
@@ -0,0 +1,202 @@
+"""Minimal in-process metrics rendered in the Prometheus text format.
+
+Updating a metric is a plain attribute update (plus a bisect for
+histograms), cheap enough to stay enabled on the hot path.
+"""
+
+import os
+import resource
+import sys
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+
+    @abstractmethod
+    def samples(self) -> List[Sample]: ...
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str) -> None:
+        super().__init__(name, documentation)
+        self.value: float = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def samples(self) -> List[Sample]:
+        return [(self.name, {}, self.value)]
+
+
+class CallbackGauge(Metric):
+    """Gauge whose samples are computed at scrape time.
+
+    The callback returns either a single value or a mapping of label values
+    (for `label`) to values.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], object],
+        label: str = "",
+    ) -> None:
+        super().__init__(name, documentation)
+        self._callback: Callable[[], object] = callback
+        self._label: str = label
+
+    def samples(self) -> List[Sample]:
+        value = self._callback()
+        if not self._label:
+            return [(self.name, {}, value)]
+        return [
+            (self.name, {self._label: str(key)}, count) for key, count in value.items()
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]) -> None:
+        super().__init__(name, documentation)
+        self._buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # one extra slot for +Inf
+        self._counts: List[int] = [0] * (len(self._buckets) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self._buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self._buckets + (float("inf"),), self._counts):
+            cumulative += count
+            samples.append(
+                (f"{self.name}_bucket", {"le": _format_value(bound)}, cumulative)
+            )
+        samples.append((f"{self.name}_sum", {}, self.sum))
+        samples.append((f"{self.name}_count", {}, self.count))
+        return samples
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # registering a metric again replaces it, e.g. on app restart
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Metric:
+        return self._metrics[name]
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _resident_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # no /proc: fall back to the peak, reported in bytes on macOS, KiB elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+REGISTRY = Registry()
+
+# same names as the process metrics of the official Prometheus clients
+REGISTRY.register(
+    CallbackGauge(
+        "process_cpu_seconds_total", "User and system CPU time spent.", _cpu_seconds
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "process_resident_memory_bytes", "Resident memory size.", _resident_bytes
+    )
+)
+
+EVENTS_EMITTED = REGISTRY.register(
+    Counter("interval_timer_events_emitted_total", "Events published to subscribers.")
+)
+EVENTS_DROPPED = REGISTRY.register(
+    Counter(
+        "interval_timer_events_dropped_total",
+        "Events dropped because a subscriber fell behind.",
+    )
+)
+STREAM_RESUMES = REGISTRY.register(
+    Counter(
+        "interval_timer_stream_resumes_total",
+        "Streams reconnected with a Last-Event-ID.",
+    )
+)
+TICK_LATENESS = REGISTRY.register(
+    Histogram(
+        "interval_timer_tick_lateness_seconds",
+        "Delay between a scheduled timer wake-up and the actual one.",
+        (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+    )
+)
+SERIALIZATION_TIME = REGISTRY.register(
+    Histogram(
+        "interval_timer_serialization_seconds",
+        "Time spent encoding one event.",
+        (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3),
+    )
+)
+CONTROL_LATENCY = REGISTRY.register(
+    Histogram(
+        "interval_timer_control_seconds",
+        "Time to handle a timer control action.",
+        (1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1),
+    )
+)
@@ -1,22 +1,9 @@
-from typing import Annotated, List, Optional
+from typing import Annotated, List, Optional, Union
 
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Discriminator, Field, Tag
 
-from enum import Enum
-
-
-class WorkoutAction(str, Enum):
-    START = "start"
-    STOP = "stop"
-    PAUSE = "pause"
-
-
-class WorkoutStatus(str, Enum):
-    RUNNING = "running"
-    PAUSED = "paused"
-    COMPLETED = "completed"
-    STOPPED = "stopped"
+from app.status import WorkoutAction, WorkoutStatus
 
 
 # Constrained string for hex colors
@@ -36,6 +23,43 @@ class IntervalCreate(BaseModel):
     }
 
 
+def _item_kind(item) -> str:
+    if isinstance(item, dict):
+        return "block" if "intervals" in item else "interval"
+    return "block" if isinstance(item, (BlockCreate, BlockResponse)) else "interval"
+
+
+class BlockCreate(BaseModel):
+    name: str
+    repeat: int = Field(default=1, ge=1)
+    # rest between repetitions
+    rest_seconds: int = Field(default=0, ge=0)
+    intervals: List["ItemCreate"] = Field(min_length=1)
+
+    model_config = {
+        "extra": "forbid",
+        "json_schema_extra": {
+            "example": {
+                "name": "Tabata",
+                "repeat": 8,
+                "intervals": [
+                    {"name": "Work", "time_seconds": 20, "color": "#FF0000"},
+                    {"name": "Rest", "time_seconds": 10, "color": "#00FF00"},
+                ],
+            }
+        },
+    }
+
+
+ItemCreate = Annotated[
+    Union[
+        Annotated[IntervalCreate, Tag("interval")],
+        Annotated[BlockCreate, Tag("block")],
+    ],
+    Discriminator(_item_kind),
+]
+
+
 class IntervalResponse(BaseModel):
     name: str
     time_seconds: int
@@ -55,10 +79,29 @@ class IntervalResponse(BaseModel):
     }
 
 
+class BlockResponse(BaseModel):
+    name: str
+    repeat: int
+    rest_seconds: int
+    intervals: List["ItemResponse"]
+
+    model_config = {"extra": "forbid"}
+
+
+ItemResponse = Annotated[
+    Union[
+        Annotated[IntervalResponse, Tag("interval")],
+        Annotated[BlockResponse, Tag("block")],
+    ],
+    Discriminator(_item_kind),
+]
+
+
 class TrainingCreate(BaseModel):
     name: str
     max_rounds: Optional[int] = Field(default=None, ge=1)
-    intervals: List[IntervalCreate]
+    # intervals and blocks of intervals, nested to any depth
+    intervals: List[ItemCreate]
 
     model_config = {
         "json_schema_extra": {
@@ -74,11 +117,95 @@ class TrainingCreate(BaseModel):
     }
 
 
+LibraryTag = Annotated[str, Field(min_length=1, max_length=64)]
+
+
+class LibraryTrainingCreate(TrainingCreate):
+    owner: str = ""
+    tags: List[LibraryTag] = []
+
+
+class LibraryTrainingUpdate(LibraryTrainingCreate):
+    # only update if the entry is still at this version
+    version: Optional[int] = Field(default=None, ge=1)
+
+
+class LibraryEntryResponse(BaseModel):
+    id: int
+    name: str
+    owner: str
+    tags: List[str]
+    version: int
+    updated_at: float
+    training: TrainingCreate
+
+    model_config = {"extra": "forbid"}
+
+
+class LibraryPageResponse(BaseModel):
+    entries: List[LibraryEntryResponse]
+    next_cursor: Optional[int]
+
+    model_config = {"extra": "forbid"}
+
+
+class BulkImportError(BaseModel):
+    line: int
+    error: str
+
+    model_config = {"extra": "forbid"}
+
+
+class BulkImportResponse(BaseModel):
+    imported: int
+    failed: int
+    # only the first errors are listed, `failed` counts all of them
+    errors: List[BulkImportError]
+
+    model_config = {"extra": "forbid"}
+
+
 class TrainingResponse(BaseModel):
     name: str
     max_rounds: Optional[int]
     current_round: int
-    intervals: List[IntervalResponse]
+    intervals: List[ItemResponse]
+
+    model_config = {"extra": "forbid"}
+
+
+class TimelineEntryResponse(BaseModel):
+    position: int
+    current_round: int
+    index: int
+    name: str
+    color: str
+    time_seconds: int
+    start_seconds: float
+    end_seconds: float
+
+    model_config = {"extra": "forbid"}
+
+
+class TimelineResponse(BaseModel):
+    name: str
+    max_rounds: Optional[int]
+    round_seconds: float
+    total_seconds: Optional[float]
+    total_entries: Optional[int]
+    offset: int
+    next_offset: Optional[int]
+    entries: List[TimelineEntryResponse]
+
+    model_config = {"extra": "forbid"}
+
+
+class DriftResponse(BaseModel):
+    count: int
+    last_seconds: float
+    mean_seconds: float
+    max_seconds: float
+    compensation_seconds: float
 
     model_config = {"extra": "forbid"}
 
@@ -97,6 +224,7 @@ class UpdateWorkoutRequest(BaseModel):
 
 class IntervalEvent(BaseModel):
     interval_name: str
+    interval_index: int
     status: WorkoutStatus
     remaining_seconds: int
     remaining_hh: int
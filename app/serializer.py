@@ -0,0 +1,106 @@
+import json
+import struct
+from functools import lru_cache
+from typing import Optional
+
+from app.core import WorkoutEvent
+from app.status import WorkoutStatus
+
+# Same key order and layout as IntervalEvent.model_dump_json(), only the
+# values are filled in per event.
+_EVENT_TEMPLATE = (
+    b'{"interval_name":%s,"interval_index":%d,"status":%s,"remaining_seconds":%d,'
+    b'"remaining_hh":%d,"remaining_mm":%d,"remaining_ss":%d,'
+    b'"current_round":%d,"max_rounds":%s,"duration":%a,"paused":%a}'
+)
+_SSE_TEMPLATE = b"data: " + _EVENT_TEMPLATE + b"\n\n"
+
+_STATUS = {status: json.dumps(status.value).encode() for status in WorkoutStatus}
+
+
+@lru_cache(maxsize=1024)
+def _encode_str(value: str) -> bytes:
+    return json.dumps(value, ensure_ascii=False).encode()
+
+
+def _encode(template: bytes, event: WorkoutEvent) -> bytes:
+    max_rounds = event.max_rounds
+    return template % (
+        _encode_str(event.interval_name),
+        event.interval_index,
+        _STATUS[event.status],
+        event.remaining_seconds,
+        event.remaining_hh,
+        event.remaining_mm,
+        event.remaining_ss,
+        event.current_round,
+        b"null" if max_rounds is None else b"%d" % max_rounds,
+        float(event.duration),
+        float(event.paused),
+    )
+
+
+def encode_event(event: WorkoutEvent) -> bytes:
+    """Encode an event as JSON, equivalent to `IntervalEvent.model_dump_json()`."""
+    return _encode(_EVENT_TEMPLATE, event)
+
+
+def encode_sse(event: WorkoutEvent, event_id: Optional[str] = None) -> bytes:
+    """Encode an event as a complete SSE message, with an `id:` line if given."""
+    if event_id is None:
+        return _encode(_SSE_TEMPLATE, event)
+    return b"id: %s\n" % event_id.encode() + _encode(_SSE_TEMPLATE, event)
+
+
+# Compact binary layout, little endian, 28 bytes:
+#   status code (u8), flags (u8, bit 0: max_rounds set), 2 padding bytes,
+#   interval index (u32), remaining seconds (u32), current round (u32),
+#   max rounds (u32), duration (f32), paused (f32)
+BINARY_EVENT = struct.Struct("<BBxxIIIIff")
+
+STATUS_CODES = {
+    WorkoutStatus.STOPPED: 0,
+    WorkoutStatus.RUNNING: 1,
+    WorkoutStatus.PAUSED: 2,
+    WorkoutStatus.COMPLETED: 3,
+}
+_STATUS_BY_CODE = {code: status for status, code in STATUS_CODES.items()}
+
+_FLAG_MAX_ROUNDS = 0x01
+
+
+def encode_binary(event: WorkoutEvent) -> bytes:
+    max_rounds = event.max_rounds
+    return BINARY_EVENT.pack(
+        STATUS_CODES[event.status],
+        0 if max_rounds is None else _FLAG_MAX_ROUNDS,
+        event.interval_index,
+        event.remaining_seconds,
+        event.current_round,
+        max_rounds or 0,
+        event.duration,
+        event.paused,
+    )
+
+
+def decode_binary(data: bytes) -> dict:
+    """Decode a binary event; the interval name is not part of the frame."""
+    (
+        status,
+        flags,
+        interval_index,
+        remaining_seconds,
+        current_round,
+        max_rounds,
+        duration,
+        paused,
+    ) = BINARY_EVENT.unpack(data)
+    return {
+        "interval_index": interval_index,
+        "status": _STATUS_BY_CODE[status],
+        "remaining_seconds": remaining_seconds,
+        "current_round": current_round,
+        "max_rounds": max_rounds if flags & _FLAG_MAX_ROUNDS else None,
+        "duration": duration,
+        "paused": paused,
+    }
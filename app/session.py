@@ -0,0 +1,154 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional
+
+from app.broadcast import Broadcaster
+from app.core import Training, Workout
+
+
+class SessionLimitError(Exception):
+    pass
+
+
+class Session:
+    __slots__ = ("_id", "_training", "_timer", "_broadcaster", "_last_access")
+
+    def __init__(
+        self,
+        session_id: str,
+        training: Training,
+        heartbeat_seconds: float = 15.0,
+        retry_seconds: float = 3.0,
+    ) -> None:
+        self._id: str = session_id
+        self._training: Training = training
+        self._timer: Workout = Workout()
+        self._broadcaster: Broadcaster = Broadcaster(
+            self._timer,
+            training,
+            heartbeat_seconds=heartbeat_seconds,
+            retry_seconds=retry_seconds,
+        )
+        self._last_access: float = time.monotonic()
+
+    def get_id(self) -> str:
+        return self._id
+
+    def get_training(self) -> Training:
+        return self._training
+
+    def set_training(self, training: Training) -> None:
+        self._training = training
+        self._broadcaster.set_training(training)
+
+    def get_timer(self) -> Workout:
+        return self._timer
+
+    def get_broadcaster(self) -> Broadcaster:
+        return self._broadcaster
+
+    def get_last_access(self) -> float:
+        return self._last_access
+
+    def touch(self, now: float) -> None:
+        self._last_access = now
+
+    def is_active(self) -> bool:
+        return self._broadcaster.get_subscriber_count() > 0
+
+
+class SessionRegistry:
+    """Sessions addressed by id, kept in least-recently-used order.
+
+    Idle sessions are evicted once they are older than `ttl_seconds` or when
+    more than `max_sessions` exist. Sessions with live subscribers are never
+    evicted. Pinned sessions (the default one) are kept outside the LRU.
+    """
+
+    def __init__(
+        self,
+        default_training: Training,
+        max_sessions: int = 10_000,
+        ttl_seconds: float = 3600.0,
+        heartbeat_seconds: float = 15.0,
+        retry_seconds: float = 3.0,
+        on_evict: Optional[Callable[[Session], None]] = None,
+    ) -> None:
+        if max_sessions <= 0:
+            raise ValueError("max_sessions must be positive")
+
+        self._default_training: Training = default_training
+        self._max_sessions: int = max_sessions
+        self._ttl_seconds: float = ttl_seconds
+        self._heartbeat_seconds: float = heartbeat_seconds
+        self._retry_seconds: float = retry_seconds
+        self._on_evict: Optional[Callable[[Session], None]] = on_evict
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._pinned: Dict[str, Session] = {}
+
+    def __len__(self) -> int:
+        return len(self._sessions) + len(self._pinned)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._pinned or session_id in self._sessions
+
+    def sessions(self) -> Iterator[Session]:
+        yield from self._pinned.values()
+        yield from self._sessions.values()
+
+    def pin(self, session_id: str) -> Session:
+        session = self._sessions.pop(session_id, None) or self._create(session_id)
+        self._pinned[session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Session:
+        now = time.monotonic()
+        session = self._pinned.get(session_id)
+        if session is None:
+            session = self._sessions.get(session_id)
+            if session is None:
+                self.evict(now, reserve=1)
+                session = self._create(session_id)
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+        session.touch(now)
+        return session
+
+    def remove(self, session_id: str) -> Optional[Session]:
+        return self._sessions.pop(session_id, None)
+
+    def _create(self, session_id: str) -> Session:
+        return Session(
+            session_id,
+            self._default_training,
+            heartbeat_seconds=self._heartbeat_seconds,
+            retry_seconds=self._retry_seconds,
+        )
+
+    def evict(self, now: Optional[float] = None, reserve: int = 0) -> int:
+        """Drop expired sessions and make room for `reserve` new ones."""
+        if now is None:
+            now = time.monotonic()
+
+        evicted = 0
+        # only the head of the LRU can be expired; active sessions met on the
+        # way are refreshed so every step is O(1)
+        for _ in range(len(self._sessions)):
+            session_id, session = next(iter(self._sessions.items()))
+            over_limit = len(self._sessions) + reserve > self._max_sessions
+            expired = now - session.get_last_access() >= self._ttl_seconds
+            if not over_limit and not expired:
+                break
+            if session.is_active():
+                session.touch(now)
+                self._sessions.move_to_end(session_id)
+                continue
+            del self._sessions[session_id]
+            evicted += 1
+            if self._on_evict is not None:
+                self._on_evict(session)
+
+        if len(self._sessions) + reserve > self._max_sessions:
+            raise SessionLimitError("too many active sessions")
+        return evicted
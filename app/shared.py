@@ -0,0 +1,244 @@
+"""Workout state shared by the worker processes of one host.
+
+Every worker (`uvicorn --workers N`) attaches to the same POSIX shared
+memory segment. Control actions and training changes handled by any worker
+are published there, and each worker polls a sequence number to pick up
+changes made elsewhere. Workout timestamps come from the system-wide
+monotonic clock, so they mean the same in every process.
+"""
+
+import asyncio
+import fcntl
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.core import WorkoutRecord
+from app.model import TrainingCreate
+from app.serializer import STATUS_CODES
+from app.session import Session
+from app.util import to_model
+
+# sequence (odd while a write is in progress), training version, status code,
+# started_at, paused_at, paused_total, training JSON length
+_HEADER = struct.Struct("<QQBdddI")
+_SEQUENCE = struct.Struct("<Q")
+_STATUS_BY_CODE = {code: status for status, code in STATUS_CODES.items()}
+# attempts of a reader to get a copy no write overlapped with
+_READ_ATTEMPTS = 100
+
+
+class SharedSnapshot(NamedTuple):
+    sequence: int
+    record: WorkoutRecord
+    training_version: int
+    training: bytes
+
+
+class SharedWorkoutState:
+    """Seqlock-protected workout record plus training definition in shared memory.
+
+    Writers serialize through an exclusive `flock` on a lock file; readers
+    never block and retry when a write overlapped their read.
+    """
+
+    def __init__(self, name: str, capacity: int = 1 << 20) -> None:
+        size = _HEADER.size + capacity
+        try:
+            self._shm = shared_memory.SharedMemory(
+                name=name, create=True, size=size, track=False
+            )
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        self._capacity: int = self._shm.size - _HEADER.size
+        lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        self._lock_fd: int = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._lock_depth: int = 0
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Writers' lock across processes, reentrant within this attachment."""
+        if self._lock_depth == 0:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def get_sequence(self) -> int:
+        return _SEQUENCE.unpack_from(self._shm.buf, 0)[0]
+
+    def publish(
+        self, record: WorkoutRecord, training: Optional[bytes] = None
+    ) -> Tuple[int, int]:
+        """Store `record` (and a new training, if given).
+
+        Returns the new sequence number and training version.
+        """
+        if training is not None and len(training) > self._capacity:
+            raise ValueError("training exceeds shared memory capacity")
+
+        buf = self._shm.buf
+        with self.lock():
+            sequence, training_version, _, _, _, _, length = _HEADER.unpack_from(buf, 0)
+            # a writer died halfway through, keep odd meaning "being written"
+            sequence += sequence % 2
+            _SEQUENCE.pack_into(buf, 0, sequence + 1)
+            if training is not None:
+                training_version += 1
+                length = len(training)
+                buf[_HEADER.size : _HEADER.size + length] = training
+            _HEADER.pack_into(
+                buf,
+                0,
+                sequence + 1,
+                training_version,
+                STATUS_CODES[record.status],
+                record.started_at,
+                record.paused_at,
+                record.paused_total,
+                length,
+            )
+            _SEQUENCE.pack_into(buf, 0, sequence + 2)
+            return sequence + 2, training_version
+
+    def read(self) -> Optional[SharedSnapshot]:
+        """Consistent copy of the shared state.
+
+        None if nothing was published yet, or if writes kept overlapping the
+        read (or a writer died mid-write); callers simply try again later.
+        """
+        buf = self._shm.buf
+        for _ in range(_READ_ATTEMPTS):
+            header = _HEADER.unpack_from(buf, 0)
+            sequence = header[0]
+            if sequence % 2 == 0:
+                training = bytes(buf[_HEADER.size : _HEADER.size + header[6]])
+                if _SEQUENCE.unpack_from(buf, 0)[0] == sequence:
+                    break
+            # let the writer make progress
+            time.sleep(0)
+        else:
+            return None
+
+        if sequence == 0:
+            return None
+        _, training_version, status, started_at, paused_at, paused_total, _ = header
+        return SharedSnapshot(
+            sequence=sequence,
+            record=WorkoutRecord(
+                status=_STATUS_BY_CODE[status],
+                started_at=started_at,
+                paused_at=paused_at,
+                paused_total=paused_total,
+            ),
+            training_version=training_version,
+            training=training,
+        )
+
+    def close(self) -> None:
+        self._shm.close()
+        os.close(self._lock_fd)
+
+    def unlink(self) -> None:
+        self._shm.unlink()
+
+
+class SharedSessionSync:
+    """Keeps one session in step with the shared state of all workers.
+
+    Local changes go through `update`, so they are applied on top of the
+    latest shared state instead of overwriting changes made elsewhere.
+    """
+
+    def __init__(
+        self, state: SharedWorkoutState, session: Session, poll_seconds: float = 0.02
+    ) -> None:
+        self._state: SharedWorkoutState = state
+        self._session: Session = session
+        self._poll_seconds: float = poll_seconds
+        self._sequence: int = 0
+        self._training_version: int = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @contextmanager
+    def update(self) -> Iterator["SharedSessionSync"]:
+        """
+        Hold the writers' lock with the session brought up to date.
+
+        Change the session and publish it inside the block, e.g.:
+
+            with sync.update():
+                session.get_timer().pause()
+                sync.publish_timer()
+        """
+        with self._state.lock():
+            self.pull()
+            yield self
+
+    def publish_timer(self) -> None:
+        self._publish(None)
+
+    def publish_training(self, payload: TrainingCreate) -> None:
+        self._publish(payload.model_dump_json().encode())
+
+    def _publish(self, training: Optional[bytes]) -> None:
+        record = self._session.get_timer().get_record()
+        with self._state.lock():
+            current = self._state.get_sequence() == self._sequence
+            sequence, training_version = self._state.publish(record, training)
+            # skip our own write when pulling, unless it follows writes of
+            # other workers we have not applied yet
+            if current:
+                self._sequence = sequence
+                self._training_version = training_version
+
+    def pull(self) -> None:
+        """Apply changes published by other workers, if any."""
+        if self._state.get_sequence() == self._sequence:
+            return
+
+        snapshot = self._state.read()
+        if snapshot is None:
+            return
+        self._sequence = snapshot.sequence
+        if snapshot.training_version != self._training_version:
+            self._training_version = snapshot.training_version
+            try:
+                payload = TrainingCreate.model_validate_json(snapshot.training)
+            except ValidationError:
+                # left torn by a writer that died, keep ours until the next one
+                payload = None
+            if payload is not None:
+                self._session.set_training(to_model(payload))
+        if snapshot.record != self._session.get_timer().get_record():
+            self._session.get_timer().restore(snapshot.record)
+            self._session.get_broadcaster().publish()
+
+    def start(self) -> None:
+        self.pull()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._state.close()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._poll_seconds)
+            self.pull()
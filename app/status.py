@@ -0,0 +1,20 @@
+"""Workout states and control actions.
+
+Kept free of pydantic so the timer core (`app.core`) imports on its own;
+`app.model` re-exports both enums for the API.
+"""
+
+from enum import Enum
+
+
+class WorkoutAction(str, Enum):
+    START = "start"
+    STOP = "stop"
+    PAUSE = "pause"
+
+
+class WorkoutStatus(str, Enum):
+    RUNNING = "running"
+    PAUSED = "paused"
+    COMPLETED = "completed"
+    STOPPED = "stopped"
@@ -1,5 +1,40 @@
-from app.core import Interval, Training
-from app.model import IntervalResponse, TrainingCreate, TrainingResponse
+from typing import TYPE_CHECKING, Union
+
+from app.core import Block, DriftStats, Interval, Training
+from app.model import (
+    BlockCreate,
+    BlockResponse,
+    DriftResponse,
+    IntervalCreate,
+    IntervalResponse,
+    LibraryEntryResponse,
+    LibraryTrainingCreate,
+    TimelineEntryResponse,
+    TimelineResponse,
+    TrainingCreate,
+    TrainingResponse,
+)
+
+if TYPE_CHECKING:
+    from app.library import LibraryEntry
+
+
+def _to_item_resp(
+    item: Union[Interval, Block],
+) -> Union[IntervalResponse, BlockResponse]:
+    if isinstance(item, Block):
+        return BlockResponse(
+            name=item.get_name(),
+            repeat=item.get_repeat(),
+            rest_seconds=item.get_rest_seconds(),
+            intervals=[_to_item_resp(i) for i in item.get_intervals()],
+        )
+    return IntervalResponse(
+        name=item.get_name(),
+        time_seconds=item.get_time_seconds(),
+        remaining=item.get_remaining_seconds(),
+        color=item.get_color(),
+    )
 
 
 def to_training_resp(training: Training) -> TrainingResponse:
@@ -7,24 +42,84 @@ def to_training_resp(training: Training) -> TrainingResponse:
         name=training.get_name(),
         max_rounds=training.get_max_rounds(),
         current_round=training.get_current_round(),
-        intervals=[
-            IntervalResponse(
-                name=i.get_name(),
-                time_seconds=i.get_time_seconds(),
-                remaining=i.get_remaining_seconds(),
-                color=i.get_color(),
-            )
-            for i in training.get_intervals()
-        ],
+        intervals=[_to_item_resp(i) for i in training.get_intervals()],
+    )
+
+
+def to_timeline_resp(training: Training, offset: int, limit: int) -> TimelineResponse:
+    schedule = training.compile()
+    entries = [
+        TimelineEntryResponse(
+            position=e.position,
+            current_round=e.current_round,
+            index=e.index,
+            name=e.interval.get_name(),
+            color=e.interval.get_color(),
+            time_seconds=e.interval.get_time_seconds(),
+            start_seconds=e.start,
+            end_seconds=e.end,
+        )
+        for e in schedule.entries(offset, limit)
+    ]
+    total_entries = schedule.get_entry_count()
+    next_offset = offset + len(entries)
+    if total_entries is not None and next_offset >= total_entries:
+        next_offset = None
+
+    return TimelineResponse(
+        name=training.get_name(),
+        max_rounds=training.get_max_rounds(),
+        round_seconds=schedule.get_round_seconds(),
+        total_seconds=schedule.get_total_seconds(),
+        total_entries=total_entries,
+        offset=offset,
+        next_offset=next_offset,
+        entries=entries,
     )
 
 
+def to_library_entry_resp(entry: "LibraryEntry") -> LibraryEntryResponse:
+    return LibraryEntryResponse(
+        id=entry.id,
+        name=entry.name,
+        owner=entry.owner,
+        tags=list(entry.tags),
+        version=entry.version,
+        updated_at=entry.updated_at,
+        training=entry.training,
+    )
+
+
+def to_training_create(payload: LibraryTrainingCreate) -> TrainingCreate:
+    return TrainingCreate(
+        name=payload.name, max_rounds=payload.max_rounds, intervals=payload.intervals
+    )
+
+
+def to_drift_resp(drift: DriftStats) -> DriftResponse:
+    return DriftResponse(
+        count=drift.count,
+        last_seconds=drift.last,
+        mean_seconds=drift.get_mean(),
+        max_seconds=drift.max,
+        compensation_seconds=drift.get_compensation(),
+    )
+
+
+def _to_item(item: Union[IntervalCreate, BlockCreate]) -> Union[Interval, Block]:
+    if isinstance(item, BlockCreate):
+        return Block(
+            name=item.name,
+            intervals=[_to_item(i) for i in item.intervals],
+            repeat=item.repeat,
+            rest_seconds=item.rest_seconds,
+        )
+    return Interval(name=item.name, time_seconds=item.time_seconds, color=item.color)
+
+
 def to_model(training: TrainingCreate) -> Training:
     return Training(
         name=training.name,
         max_rounds=training.max_rounds,
-        intervals=[
-            Interval(name=i.name, time_seconds=i.time_seconds, color=i.color)
-            for i in training.intervals
-        ],
+        intervals=[_to_item(i) for i in training.intervals],
     )
@@ -0,0 +1,391 @@
+"""SSE load test: many `/workout` subscribers of a running app plus timer actions.
+
+Usage:
+    python -m benchmarks.loadtest [--url http://127.0.0.1:8000 | --spawn]
+        [--clients 1000] [--pattern start,pause,start,stop] [--action-seconds 3]
+        [--session ID] [--output loadtest.json] [--compare BASELINE]
+
+Every subscriber is a plain asyncio connection reading the event stream, so
+thousands of them fit in one client process. Reported are the latency from
+each control action to its first event per subscriber, the jitter of the
+one-second ticks, and server CPU and memory per subscriber as scraped from
+`/metrics`. Results use the format of `benchmarks.run`, so a report can be
+compared against a baseline the same way.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.run import Results, _metric, compare
+
+EXPECTED_STATUS = {"start": "running", "pause": "paused", "stop": "stopped"}
+# connections opened at once while ramping up
+CONNECT_CONCURRENCY = 100
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of `values`, NaN if there are none."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    return ordered[
+        min(len(ordered) - 1, max(math.ceil(fraction * len(ordered)) - 1, 0))
+    ]
+
+
+class SseParser:
+    """Incremental parser of an SSE byte stream into messages."""
+
+    def __init__(self) -> None:
+        self._buffer: bytes = b""
+
+    def feed(self, data: bytes) -> List[Dict[str, str]]:
+        self._buffer += data
+        *blocks, self._buffer = self._buffer.split(b"\n\n")
+        messages = []
+        for block in blocks:
+            message = {}
+            for line in block.decode().split("\n"):
+                if not line or line.startswith(":"):
+                    continue
+                field, _, value = line.partition(":")
+                message[field] = value.removeprefix(" ")
+            if message:
+                messages.append(message)
+        return messages
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Unlabelled samples of a Prometheus text exposition."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#") and "{" not in line:
+            name, _, value = line.partition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+class Stats:
+    """Arrival times collected by all subscribers."""
+
+    def __init__(self, clients: int) -> None:
+        self.connected: int = 0
+        self.failed: int = 0
+        self.events: int = 0
+        self.latencies: List[float] = []
+        self.jitter: List[float] = []
+        # current control action: generation, expected status, time sent
+        self.generation: int = 0
+        self.expected: Optional[str] = None
+        self.sent_at: float = 0.0
+        self._seen: List[int] = [0] * clients
+        self._last_tick: List[Optional[float]] = [None] * clients
+
+    def action(self, expected: str) -> None:
+        self.generation += 1
+        self.expected = expected
+        self.sent_at = time.perf_counter()
+
+    def on_event(self, client: int, now: float, event: dict) -> None:
+        self.events += 1
+        running = event["status"] == "running"
+        if self._seen[client] < self.generation and event["status"] == self.expected:
+            self._seen[client] = self.generation
+            self.latencies.append(now - self.sent_at)
+            # a resumed timer ticks first after the rest of the paused
+            # second, only the ticks after that are on the one-second grid
+            self._last_tick[client] = None
+            return
+
+        last_tick = self._last_tick[client]
+        if running and last_tick is not None:
+            self.jitter.append(abs(now - last_tick - 1.0))
+        self._last_tick[client] = now if running else None
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode().partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+async def request(
+    host: str, port: int, method: str, path: str, body: Optional[dict] = None
+) -> Tuple[int, bytes]:
+    """Single HTTP/1.1 request on a fresh connection."""
+    reader, writer = await asyncio.open_connection(host, port)
+    payload = b"" if body is None else json.dumps(body).encode()
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode()
+        + payload
+    )
+    try:
+        status, headers = await _read_head(reader)
+        if headers.get("transfer-encoding") == "chunked":
+            content = b"".join([chunk async for chunk in _chunks(reader)])
+        else:
+            content = await reader.read()
+        return status, content
+    finally:
+        writer.close()
+
+
+async def _chunks(reader: asyncio.StreamReader):
+    """Decode a chunked transfer encoding."""
+    while True:
+        line = await reader.readline()
+        # a closed connection ends the stream like the last chunk does
+        if not line or (size := int(line.split(b";")[0], 16)) == 0:
+            return
+        data = await reader.readexactly(size + 2)
+        yield data[:-2]
+
+
+async def subscribe(
+    host: str,
+    port: int,
+    path: str,
+    client: int,
+    stats: Stats,
+    stop: asyncio.Event,
+    established: asyncio.Event,
+) -> None:
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            "Accept: text/event-stream\r\n\r\n".encode()
+        )
+        status, headers = await _read_head(reader)
+        if status != 200 or headers.get("transfer-encoding") != "chunked":
+            raise ConnectionError(f"unexpected response {status}")
+    except (OSError, ValueError):  # fmt: skip
+        stats.failed += 1
+        return
+    finally:
+        established.set()
+
+    stats.connected += 1
+    parser = SseParser()
+
+    async def receive() -> None:
+        async for chunk in _chunks(reader):
+            now = time.perf_counter()
+            for message in parser.feed(chunk):
+                if "data" in message:
+                    stats.on_event(client, now, json.loads(message["data"]))
+
+    task = asyncio.create_task(receive())
+    try:
+        await asyncio.wait(
+            [task, asyncio.create_task(stop.wait())],
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+    finally:
+        task.cancel()
+        writer.close()
+
+
+async def scrape(host: str, port: int) -> Dict[str, float]:
+    _, content = await request(host, port, "GET", "/metrics")
+    return parse_metrics(content.decode())
+
+
+async def run_load(
+    host: str,
+    port: int,
+    clients: int,
+    pattern: List[str],
+    action_seconds: float,
+    session: Optional[str] = None,
+) -> Results:
+    prefix = "" if session is None else f"/sessions/{session}"
+    stream_path = f"{prefix}/workout"
+    timer_path = f"{prefix}/timer"
+    stats = Stats(clients)
+    stop = asyncio.Event()
+
+    # a known starting point
+    await request(host, port, "POST", timer_path, {"action": "stop"})
+    before = await scrape(host, port)
+
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    async def connect(client: int) -> None:
+        # hold a slot until the connection is established (or failed)
+        async with semaphore:
+            established = asyncio.Event()
+            subscribers.append(
+                asyncio.create_task(
+                    subscribe(host, port, stream_path, client, stats, stop, established)
+                )
+            )
+            await established.wait()
+
+    subscribers: List[asyncio.Task] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(connect(i) for i in range(clients)))
+    connect_seconds = time.perf_counter() - started
+    # let the initial snapshots arrive
+    await asyncio.sleep(1.0)
+    connected = await scrape(host, port)
+
+    started = time.perf_counter()
+    for action in pattern:
+        stats.action(EXPECTED_STATUS[action])
+        await request(host, port, "POST", timer_path, {"action": action})
+        await asyncio.sleep(action_seconds)
+    duration = time.perf_counter() - started
+    after = await scrape(host, port)
+
+    stop.set()
+    await asyncio.gather(*subscribers)
+    await request(host, port, "POST", timer_path, {"action": "stop"})
+
+    n = max(stats.connected, 1)
+    cpu_percent = (
+        100
+        * (after["process_cpu_seconds_total"] - connected["process_cpu_seconds_total"])
+        / duration
+    )
+    rss = "process_resident_memory_bytes"
+    dropped = "interval_timer_events_dropped_total"
+    results: Results = {
+        "clients.connected": _metric(stats.connected, "clients", better="higher"),
+        "clients.failed": _metric(stats.failed, "clients"),
+        "clients.connect_seconds": _metric(connect_seconds, "s"),
+        "events.received": _metric(stats.events, "events", better="higher"),
+        "events.dropped": _metric(
+            after.get(dropped, 0) - before.get(dropped, 0), "events"
+        ),
+        "server.cpu_percent": _metric(cpu_percent, "%"),
+        "server.cpu_percent_per_1k_clients": _metric(cpu_percent * 1000 / n, "%"),
+        "server.rss_bytes_per_client": _metric(
+            (connected[rss] - before[rss]) / n, "bytes"
+        ),
+    }
+    for name, values in (("latency", stats.latencies), ("jitter", stats.jitter)):
+        for label, fraction in (("p50", 0.5), ("p99", 0.99), ("p999", 0.999)):
+            results[f"{name}.{label}"] = _metric(
+                percentile(values, fraction) * 1e3, "ms"
+            )
+        results[f"{name}.samples"] = _metric(len(values), "samples", better="higher")
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(host: str, port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await request(host, port, "GET", "/training")
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def _raise_fd_limit() -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:8000")
+    target.add_argument(
+        "--spawn", action="store_true", help="start the app with uvicorn first"
+    )
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--pattern", default="start,pause,start,stop")
+    parser.add_argument("--action-seconds", type=float, default=3.0)
+    parser.add_argument("--session", help="load a session instead of the default")
+    parser.add_argument("--output", default="loadtest.json")
+    parser.add_argument("--compare", metavar="BASELINE")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    pattern = args.pattern.split(",")
+    unknown = set(pattern) - set(EXPECTED_STATUS)
+    if unknown:
+        parser.error(f"unknown actions: {', '.join(sorted(unknown))}")
+
+    _raise_fd_limit()
+    server = None
+    if args.spawn:
+        host, port = "127.0.0.1", _free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app"]
+            + ["--host", host, "--port", str(port), "--log-level", "warning"],
+            env=os.environ.copy(),
+        )
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+
+    async def run() -> Results:
+        if server is not None:
+            await _wait_ready(host, port)
+        return await run_load(
+            host, port, args.clients, pattern, args.action_seconds, args.session
+        )
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "meta": {
+            "clients": args.clients,
+            "pattern": pattern,
+            "action_seconds": args.action_seconds,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, metric in results.items():
+        print(f"{name:40} {metric['value']:14.4f} {metric['unit']}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""Benchmarks for start-up, the timer engine, serialization and SSE fan-out.
+
+Usage:
+    python -m benchmarks.run [--output FILE] [--compare BASELINE] [--threshold 0.2]
+
+Every metric is written to a JSON file together with the direction that is
+considered better, so two result files can be compared mechanically.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from app.broadcast import Broadcaster
+from app.bulk import export_trainings, import_trainings
+from app.core import Interval, Training, Workout
+from app.library import Library
+from app.model import IntervalCreate, IntervalEvent, TrainingCreate
+from app.serializer import encode_sse
+from app.util import to_model, to_training_resp
+
+Results = Dict[str, Dict[str, object]]
+
+
+def _metric(value: float, unit: str, better: str = "lower") -> Dict[str, object]:
+    return {"value": value, "unit": unit, "better": better}
+
+
+def _best_of(func: Callable[[], None], number: int, repeat: int = 5) -> float:
+    """Best wall time of `repeat` runs of `number` calls, per call, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - started)
+    return best / number
+
+
+def _training(size: int) -> Training:
+    return Training(
+        "Bench",
+        [Interval(f"Interval {i}", 30 + i % 60) for i in range(size)],
+        max_rounds=10,
+    )
+
+
+def bench_workout_run(results: Results, events: int = 100_000) -> None:
+    workout = Workout()
+    workout.start()
+    run = workout.run(_training(10))
+
+    per_event = _best_of(lambda: next(run), number=events, repeat=3)
+    results["workout_run.events_per_second"] = _metric(
+        1 / per_event, "events/s", better="higher"
+    )
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    kept = [next(run) for _ in range(10_000)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["workout_run.bytes_per_event"] = _metric(
+        (after - before) / len(kept), "bytes"
+    )
+
+
+def bench_serialization(results: Results, number: int = 50_000) -> None:
+    workout = Workout()
+    workout.start()
+    event = workout.snapshot(_training(10).compile())
+
+    results["serialize.encode_sse"] = _metric(
+        _best_of(lambda: encode_sse(event), number) * 1e6, "us"
+    )
+    results["serialize.pydantic"] = _metric(
+        _best_of(lambda: IntervalEvent(**event._asdict()).model_dump_json(), number)
+        * 1e6,
+        "us",
+    )
+
+
+def bench_conversion(results: Results, sizes=(10, 1_000, 100_000)) -> None:
+    for size in sizes:
+        payload = TrainingCreate(
+            name="Bench",
+            max_rounds=10,
+            intervals=[
+                IntervalCreate(name=f"Interval {i}", time_seconds=30)
+                for i in range(size)
+            ],
+        )
+        training = to_model(payload)
+        number = max(1, 10_000 // size)
+        results[f"to_model.{size}"] = _metric(
+            _best_of(lambda: to_model(payload), number, repeat=3) * 1e3, "ms"
+        )
+        results[f"to_training_resp.{size}"] = _metric(
+            _best_of(lambda: to_training_resp(training), number, repeat=3) * 1e3,
+            "ms",
+        )
+
+
+def bench_library(results: Results, entries: int = 100_000) -> None:
+    library = Library()
+    library.create_many(
+        (
+            TrainingCreate(
+                name=f"Training {i}",
+                intervals=[IntervalCreate(name="Work", time_seconds=30 + i % 60)],
+            ),
+            f"owner {i % 100}",
+            [f"tag {i % 10}"],
+        )
+        for i in range(entries)
+    )
+    entry_id = entries // 2
+    library.get_training(entry_id)
+
+    results[f"library.{entries}.start_cached"] = _metric(
+        _best_of(lambda: library.get_training(entry_id), 10_000) * 1e6, "us"
+    )
+    results[f"library.{entries}.list_by_tag"] = _metric(
+        _best_of(lambda: library.list(tag="tag 3", cursor=entry_id, limit=100), 100)
+        * 1e3,
+        "ms",
+    )
+    library.close()
+
+
+def bench_bulk(results: Results, trainings: int = 20_000) -> None:
+    lines = [
+        json.dumps(
+            {
+                "name": f"Training {i}",
+                "owner": f"owner {i % 100}",
+                "tags": [f"tag {i % 10}"],
+                "intervals": [
+                    {"name": "Work", "time_seconds": 30},
+                    {"name": "Rest", "time_seconds": 10},
+                ],
+            }
+        )
+        for i in range(trainings)
+    ]
+    library = Library()
+    started = time.perf_counter()
+    import_trainings(library, lines)
+    results["bulk.import_ndjson"] = _metric(
+        trainings / (time.perf_counter() - started), "trainings/s", better="higher"
+    )
+
+    for format in ("ndjson", "csv"):
+        started = time.perf_counter()
+        for _ in export_trainings(library, format):
+            pass
+        results[f"bulk.export_{format}"] = _metric(
+            trainings / (time.perf_counter() - started), "trainings/s", better="higher"
+        )
+    library.close()
+
+
+async def _fan_out(clients: int, rounds: int) -> List[float]:
+    workout = Workout()
+    broadcaster = Broadcaster(workout, _training(10))
+    streams = [broadcaster.stream() for _ in range(clients)]
+    # every client receives the initial state first
+    await asyncio.gather(*(anext(stream) for stream in streams))
+
+    latencies: List[float] = []
+
+    async def receive(stream) -> None:
+        await anext(stream)
+        latencies.append(time.perf_counter() - started)
+
+    for i in range(rounds):
+        receivers = [asyncio.ensure_future(receive(s)) for s in streams]
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        workout.start() if i % 2 == 0 else workout.stop()
+        await asyncio.gather(*receivers)
+
+    for stream in streams:
+        await stream.aclose()
+    await broadcaster.close()
+    return latencies
+
+
+def bench_fan_out(results: Results, clients: int = 1_000, rounds: int = 20) -> None:
+    latencies = sorted(asyncio.run(_fan_out(clients, rounds)))
+    results[f"fan_out.{clients}.p50"] = _metric(
+        statistics.median(latencies) * 1e3, "ms"
+    )
+    results[f"fan_out.{clients}.p99"] = _metric(
+        latencies[int(len(latencies) * 0.99) - 1] * 1e3, "ms"
+    )
+
+
+def _import_seconds(module: str) -> float:
+    """Time to import `module` in a fresh interpreter."""
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - started)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return float(output)
+
+
+def bench_import(results: Results, repeat: int = 5) -> None:
+    for module in ("app.core", "app.main"):
+        best = min(_import_seconds(module) for _ in range(repeat))
+        results[f"import.{module}"] = _metric(best * 1e3, "ms")
+
+
+BENCHMARKS = [
+    bench_import,
+    bench_workout_run,
+    bench_serialization,
+    bench_conversion,
+    bench_library,
+    bench_bulk,
+    bench_fan_out,
+]
+
+
+def run_all() -> dict:
+    results: Results = {}
+    for bench in BENCHMARKS:
+        print(f"running {bench.__name__}...", file=sys.stderr)
+        bench(results)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Return a message for every metric that got worse by more than `threshold`."""
+    regressions = []
+    for name, base in baseline["results"].items():
+        metric = current["results"].get(name)
+        if metric is None or not base["value"]:
+            continue
+        change = (metric["value"] - base["value"]) / base["value"]
+        if base["better"] == "higher":
+            change = -change
+        if change > threshold:
+            regressions.append(
+                f"{name}: {base['value']:.4g} -> {metric['value']:.4g} "
+                f"{metric['unit']} ({change:+.0%} worse)"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", metavar="BASELINE")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    current = run_all()
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+
+    for name, metric in current["results"].items():
+        print(f"{name:40} {metric['value']:14.4f} {metric['unit']}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
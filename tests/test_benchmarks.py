@@ -0,0 +1,33 @@
+from benchmarks.run import compare
+
+
+def _results(**metrics):
+    return {
+        "results": {
+            name: {"value": value, "unit": "us", "better": better}
+            for name, (value, better) in metrics.items()
+        }
+    }
+
+
+def test_compare_flags_regressions():
+    baseline = _results(latency=(10.0, "lower"), throughput=(100.0, "higher"))
+    current = _results(latency=(13.0, "lower"), throughput=(70.0, "higher"))
+
+    regressions = compare(current, baseline, threshold=0.2)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("latency:")
+
+
+def test_compare_ignores_improvements_and_noise():
+    baseline = _results(latency=(10.0, "lower"), throughput=(100.0, "higher"))
+    current = _results(latency=(5.0, "lower"), throughput=(90.0, "higher"))
+
+    assert compare(current, baseline, threshold=0.2) == []
+
+
+def test_compare_skips_unknown_metrics():
+    baseline = _results(latency=(10.0, "lower"))
+
+    assert compare(_results(), baseline, threshold=0.2) == []
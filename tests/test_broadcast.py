@@ -0,0 +1,261 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.broadcast import KEEP_ALIVE, Broadcaster, Subscriber
+from app.clock import VirtualClock
+from app.core import Interval, Training, Workout
+from app.model import WorkoutStatus
+
+
+@pytest.fixture
+def training():
+    return Training("Test", [Interval("Work", 60), Interval("Rest", 30)])
+
+
+def test_subscriber_keeps_only_the_latest_frame():
+    subscriber = Subscriber([b"missed"])
+
+    subscriber.put(b"1")
+    subscriber.put(b"2")
+    subscriber.put(b"3")
+
+    assert subscriber.get_dropped() == 2
+    # a backlog from a resume comes first, then only the newest frame
+    assert asyncio.run(subscriber.get()) == b"missed"
+    assert asyncio.run(subscriber.get()) == b"3"
+    assert subscriber.take() is None
+
+
+@pytest.mark.asyncio
+async def test_subscribers_share_encoded_events(training):
+    broadcaster = Broadcaster(Workout(), training)
+
+    first = broadcaster.subscribe()
+    second = broadcaster.subscribe()
+    frame_first = await first.get()
+    frame_second = await second.get()
+
+    # serialized once, the very same bytes reach every subscriber
+    assert frame_first is frame_second
+    assert frame_first.sse() is frame_second.sse()
+    assert frame_first.sse().startswith(b"id: %s\ndata: " % frame_first.id.encode())
+    event = json.loads(frame_first.json())
+    assert event["interval_name"] == "Work"
+    assert event["status"] == "stopped"
+
+    await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_producer_stops_without_subscribers(training):
+    broadcaster = Broadcaster(Workout(), training)
+
+    subscriber = broadcaster.subscribe()
+    assert broadcaster.get_subscriber_count() == 1
+    await subscriber.get()
+
+    broadcaster.unsubscribe(subscriber)
+    assert broadcaster.get_subscriber_count() == 0
+    assert broadcaster._task is None
+
+
+@pytest.mark.asyncio
+async def test_set_training_switches_schedule(training):
+    broadcaster = Broadcaster(Workout(), training)
+    subscriber = broadcaster.subscribe()
+    await subscriber.get()
+
+    broadcaster.set_training(Training("Other", [Interval("Sprint", 20)]))
+    frame = await subscriber.get()
+
+    assert frame.event.interval_name == "Sprint"
+    await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_only_changes_are_published(training):
+    broadcaster = Broadcaster(Workout(), training)
+    subscriber = broadcaster.subscribe()
+    await subscriber.get()
+
+    # a stopped workout does not change, so nothing else is queued
+    await asyncio.sleep(0.05)
+    assert subscriber.take() is None
+
+    # late joiners still get the current state
+    late = broadcaster.subscribe()
+    assert (await late.get()).event.status == "stopped"
+    await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_publish_reaches_subscribers_before_returning(training):
+    workout = Workout()
+    broadcaster = Broadcaster(workout, training)
+    assert broadcaster.publish() is None
+    subscriber = broadcaster.subscribe()
+    await subscriber.get()
+
+    workout.start()
+    frame = broadcaster.publish()
+
+    # queued without giving the producer a chance to run
+    assert subscriber.take() is frame
+    assert frame.event.status == WorkoutStatus.RUNNING
+    # the woken producer does not publish the same state again
+    await asyncio.sleep(0.01)
+    assert subscriber.take() is None
+    assert broadcaster.publish() is None
+
+    await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_keep_alive(training):
+    broadcaster = Broadcaster(Workout(), training, heartbeat_seconds=0.01)
+    stream = broadcaster.stream()
+
+    first = await anext(stream)
+    assert first.startswith(b"retry: ")
+    assert b"\ndata: " in first
+    assert await anext(stream) == KEEP_ALIVE
+
+    await stream.aclose()
+    assert broadcaster.get_subscriber_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_idle_producers_are_parked(training, monkeypatch):
+    snapshots = []
+    original = Workout.snapshot
+
+    def counting_snapshot(self, schedule):
+        snapshots.append(self)
+        return original(self, schedule)
+
+    monkeypatch.setattr(Workout, "snapshot", counting_snapshot)
+
+    broadcasters = [Broadcaster(Workout(), training) for _ in range(1000)]
+    subscribers = [b.subscribe() for b in broadcasters]
+    await asyncio.gather(*(s.get() for s in subscribers))
+    await asyncio.sleep(0.1)
+
+    # one snapshot per idle workout, nothing while waiting for a control action
+    assert len(snapshots) == 1000
+
+    for broadcaster in broadcasters:
+        await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_resume_replays_missed_frames(training):
+    workout = Workout()
+    broadcaster = Broadcaster(workout, training, history_size=4)
+    subscriber = broadcaster.subscribe()
+    ids = [(await subscriber.get()).id]
+    for action in (workout.start, workout.pause, workout.start):
+        action()
+        ids.append((await subscriber.get()).id)
+
+    resumed = broadcaster.subscribe(last_event_id=ids[1])
+    assert [(await resumed.get()).id for _ in range(2)] == ids[2:]
+    # up to date clients get nothing until the next change
+    assert broadcaster.get_missed(ids[-1]) == []
+
+    await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_limits_rate_of_ticks(training):
+    # a virtual clock runs the workout as fast as the producer can go
+    workout = Workout(VirtualClock())
+    workout.start()
+    broadcaster = Broadcaster(workout, training)
+    stream = broadcaster.stream(hz=20)
+
+    messages = [await anext(stream)]
+    started = time.monotonic()
+    while time.monotonic() - started < 0.2:
+        messages.append(await anext(stream))
+
+    assert len(messages) <= 6
+    assert broadcaster._sequence > 10 * len(messages)
+
+    await stream.aclose()
+    await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_status_changes_right_away(training):
+    workout = Workout()
+    workout.start()
+    broadcaster = Broadcaster(workout, training)
+    stream = broadcaster.stream(hz=0.1)
+    await anext(stream)
+
+    workout.pause()
+    broadcaster.publish()
+    message = await asyncio.wait_for(anext(stream), 0.5)
+
+    assert json.loads(message.split(b"data: ")[1])["status"] == "paused"
+    await stream.aclose()
+    await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_close_ends_streams(training):
+    workout = Workout()
+    broadcaster = Broadcaster(workout, training)
+    stream = broadcaster.stream()
+    await anext(stream)
+    waiting = asyncio.create_task(anext(stream))
+    await asyncio.sleep(0)
+
+    await broadcaster.close()
+
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(waiting, 1)
+    assert broadcaster.get_subscriber_count() == 0
+
+
+async def _publish(broadcaster, workout, changes):
+    subscriber = broadcaster.subscribe()
+    ids = [(await subscriber.get()).id]
+    for action in (workout.start, workout.pause, workout.start)[:changes]:
+        action()
+        ids.append((await subscriber.get()).id)
+    return ids
+
+
+@pytest.mark.asyncio
+async def test_resume_with_unknown_id_gets_snapshot(training):
+    workout = Workout()
+    broadcaster = Broadcaster(workout, training, history_size=2)
+    ids = await _publish(broadcaster, workout, 3)
+
+    # the first id fell out of the history, the others are no ids of ours
+    for last_event_id in (ids[0], "junk", "abc-x", "99"):
+        assert [f.id for f in broadcaster.get_missed(last_event_id)] == ids[-1:]
+    assert workout.get_state() == WorkoutStatus.RUNNING
+
+    await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_resume_ignores_ids_of_previous_broadcaster(training):
+    # e.g. a restarted process or a recreated session numbering from 1 again
+    old_workout = Workout()
+    old = Broadcaster(old_workout, training)
+    old_ids = await _publish(old, old_workout, 0)
+    await old.close()
+    workout = Workout()
+    new = Broadcaster(workout, training)
+    new_ids = await _publish(new, workout, 2)
+
+    assert old_ids[0].split("-")[1] == new_ids[0].split("-")[1]
+    assert [f.id for f in new.get_missed(old_ids[0])] == new_ids[-1:]
+
+    await new.close()
@@ -0,0 +1,166 @@
+import json
+
+import pytest
+
+from app.bulk import Importer, LineSplitter, export_trainings, import_trainings
+from app.library import Library
+
+CSV = """training,max_rounds,owner,tags,interval,time_seconds,color
+Tabata,8,ann,hiit;short,Work,20,#FF0000
+Tabata,8,ann,hiit;short,Rest,10,
+Broken,,bob,,Work,-5,
+Long,,bob,,"Warm, up",600,#00FF00
+"""
+
+
+@pytest.fixture
+def library():
+    library = Library()
+    yield library
+    library.close()
+
+
+def test_line_splitter_joins_chunks():
+    splitter = LineSplitter()
+
+    lines = splitter.feed(b'{"a": "\xc3') + splitter.feed(b'\xa4"}\r\n{"b"')
+    lines += splitter.close()
+
+    assert lines == ['{"a": "ä"}', '{"b"']
+
+
+def test_import_ndjson_reports_row_errors(library):
+    lines = [
+        json.dumps({"name": "Run", "intervals": [{"name": "Go", "time_seconds": 30}]}),
+        "",
+        "{not json",
+        json.dumps(
+            {
+                "name": "Swim",
+                "intervals": [{"name": "Lap", "time_seconds": 60}],
+                "tags": ["pool"],
+            }
+        ),
+        json.dumps({"name": "Bad", "intervals": [{"name": "Go", "time_seconds": 0}]}),
+    ]
+
+    result = import_trainings(library, lines)
+
+    assert (result.imported, result.failed) == (2, 2)
+    assert [e.line for e in result.errors] == [3, 5]
+    assert "intervals.0.time_seconds" in result.errors[1].error
+    assert [e.name for e in library.list()[0]] == ["Run", "Swim"]
+
+
+def test_import_csv_groups_rows(library):
+    result = import_trainings(library, CSV.splitlines(), format="csv")
+
+    assert (result.imported, result.failed) == (2, 1)
+    assert result.errors[0].line == 4
+    tabata, long = library.list()[0]
+    assert tabata.tags == ("hiit", "short")
+    assert tabata.training.max_rounds == 8
+    assert [i.time_seconds for i in tabata.training.intervals] == [20, 10]
+    assert tabata.training.intervals[1].color == "#FFFFFF"
+    assert long.training.intervals[0].name == "Warm, up"
+
+
+def test_import_csv_keeps_trainings_with_the_same_name_apart(library):
+    lines = [
+        json.dumps(
+            {
+                "name": "Tabata",
+                "owner": owner,
+                "intervals": [{"name": "Work", "time_seconds": 20}],
+            }
+        )
+        for owner in ("ann", "bob")
+    ]
+    import_trainings(library, lines)
+    exported = b"".join(export_trainings(library, "csv")).decode()
+    without_ids = "training,owner,interval,time_seconds\nT,ann,Go,5\nT,bob,Go,5\n"
+
+    for text in (exported, without_ids):
+        copy = Library()
+        result = import_trainings(copy, text.splitlines(), format="csv")
+
+        assert result.imported == 2
+        assert [e.owner for e in copy.list()[0]] == ["ann", "bob"]
+        copy.close()
+
+
+def test_import_csv_reads_fields_spanning_lines(library):
+    text = (
+        'training,interval,time_seconds\n"Two\nLines",Work,20\n'
+        '"Two\nLines",Rest,-1\nOk,"Say ""go""",5\n'
+    )
+
+    result = import_trainings(library, text.splitlines(), format="csv")
+
+    assert (result.imported, result.failed) == (1, 1)
+    # the invalid interval row starts on line 4
+    assert result.errors[0].line == 4
+    (entry,) = library.list()[0]
+    assert entry.name == "Ok"
+    assert entry.training.intervals[0].name == 'Say "go"'
+
+
+def test_import_csv_reports_unterminated_quote(library):
+    text = 'training,interval,time_seconds\nOk,Go,5\n"Open,Go,5\n'
+
+    result = import_trainings(library, text.splitlines(), format="csv")
+
+    assert (result.imported, result.failed) == (1, 1)
+    assert result.errors[0].line == 3
+
+
+def test_import_csv_needs_header(library):
+    importer = Importer(library, "csv")
+
+    with pytest.raises(ValueError):
+        importer.add("name,seconds")
+
+
+def test_import_is_batched(library):
+    importer = Importer(library, batch_size=2)
+    line = json.dumps({"name": "Run", "intervals": [{"name": "Go", "time_seconds": 3}]})
+
+    for _ in range(3):
+        importer.add(line)
+    assert len(library) == 2
+
+    assert importer.close().imported == 3
+    assert len(library) == 3
+
+
+@pytest.mark.parametrize("format", ["ndjson", "csv"])
+def test_export_round_trips(library, format):
+    import_trainings(library, CSV.splitlines(), format="csv")
+
+    exported = b"".join(export_trainings(library, format, page_size=1)).decode()
+    copy = Library()
+    result = import_trainings(copy, exported.splitlines(), format=format)
+
+    assert (result.imported, result.failed) == (2, 0)
+    original = [(e.name, e.owner, e.tags, e.training) for e in library.list()[0]]
+    assert [(e.name, e.owner, e.tags, e.training) for e in copy.list()[0]] == original
+    copy.close()
+
+
+def test_csv_export_leaves_out_blocks(library):
+    block = {
+        "name": "Set",
+        "repeat": 3,
+        "intervals": [{"name": "Go", "time_seconds": 5}],
+    }
+    lines = [
+        json.dumps({"name": "Nested", "intervals": [block]}),
+        json.dumps({"name": "Flat", "intervals": [{"name": "Go", "time_seconds": 5}]}),
+    ]
+    import_trainings(library, lines)
+
+    csv_rows = b"".join(export_trainings(library, "csv")).decode().splitlines()
+    ndjson = b"".join(export_trainings(library)).decode().splitlines()
+
+    assert [row.split(",")[1] for row in csv_rows] == ["training", "Flat"]
+    assert json.loads(ndjson[0])["intervals"][0]["repeat"] == 3
@@ -0,0 +1,93 @@
+import asyncio
+import io
+import os
+
+import pytest
+
+from app.cli import InputParser, Screen, apply_command, main, run
+from app.core import Interval, Training, Workout
+from app.model import WorkoutStatus
+
+
+@pytest.fixture
+def training():
+    return Training("Kiosk", [Interval("Work", 60), Interval("Rest", 30)], max_rounds=2)
+
+
+def test_input_parser_maps_keys():
+    parser = InputParser(keys=True)
+
+    assert parser.feed(b" xSq") == ["toggle", "stop", "quit"]
+
+
+def test_input_parser_reads_lines():
+    parser = InputParser(keys=False)
+
+    assert parser.feed(b"start\npau") == ["start"]
+    assert parser.feed(b"se\nnonsense\n STOP \n") == ["pause", "stop"]
+
+
+def test_screen_rewrites_only_changed_rows(training):
+    workout = Workout()
+    schedule = training.compile()
+    screen = Screen("Kiosk")
+
+    first = screen.update(workout.snapshot(schedule))
+    assert first.startswith("\x1b[2J")
+    assert "\x1b[3;1HWork\x1b[K" in first
+    assert "\x1b[5;1HRound 1 of 2\x1b[K" in first
+
+    workout.start()
+    update = screen.update(workout.snapshot(schedule))
+    # only the time and status rows changed
+    assert update == "\x1b[4;1H00:00:59\x1b[K\x1b[6;1Hrunning\x1b[K"
+    assert screen.update(workout.snapshot(schedule)) == ""
+
+
+def test_plain_screen_writes_a_line_per_change(training):
+    screen = Screen("Kiosk", ansi=False)
+    event = Workout().snapshot(training.compile())
+
+    assert screen.update(event) == "Work | 00:01:00 | Round 1 of 2 | stopped\n"
+    assert screen.update(event) == ""
+
+
+def test_toggle_starts_and_pauses():
+    workout = Workout()
+
+    apply_command(workout, "toggle")
+    assert workout.get_state() == WorkoutStatus.RUNNING
+    apply_command(workout, "toggle")
+    assert workout.get_state() == WorkoutStatus.PAUSED
+    with pytest.raises(ValueError):
+        apply_command(workout, "jump")
+
+
+@pytest.mark.asyncio
+async def test_run_applies_commands_until_quit(training):
+    workout = Workout()
+    output = io.StringIO()
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b"start\n")
+
+    runner = asyncio.create_task(
+        run(training, workout, read_fd, output, keys=False, ansi=False)
+    )
+    await asyncio.sleep(0.05)
+    assert workout.get_state() == WorkoutStatus.RUNNING
+    os.write(write_fd, b"quit\n")
+    await asyncio.wait_for(runner, 1)
+
+    assert output.getvalue().splitlines()[-1].endswith("| running")
+    os.close(read_fd)
+    os.close(write_fd)
+
+
+def test_main_rejects_invalid_plan(tmp_path):
+    plan = tmp_path / "plan.json"
+    plan.write_text('{"name": "Empty", "intervals": []}')
+
+    with pytest.raises(SystemExit):
+        main(["run", str(plan)])
+    with pytest.raises(SystemExit):
+        main(["run", str(tmp_path / "missing.json")])
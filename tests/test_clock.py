@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app.clock import Clock, MonotonicClock, VirtualClock
+
+
+def test_virtual_clock_advances():
+    clock = VirtualClock(10.0)
+
+    clock.advance(2.5)
+
+    assert clock.now() == 12.5
+
+
+def test_virtual_clock_cannot_go_back():
+    with pytest.raises(ValueError, match="seconds must not be negative"):
+        VirtualClock().advance(-1)
+
+
+@pytest.mark.asyncio
+async def test_virtual_wait_jumps_to_timeout():
+    clock = VirtualClock()
+
+    assert await clock.wait(asyncio.Event(), 3600) is False
+    assert clock.now() == 3600
+
+
+@pytest.mark.asyncio
+async def test_virtual_wait_returns_when_event_set():
+    clock = VirtualClock()
+    event = asyncio.Event()
+    asyncio.get_running_loop().call_soon(event.set)
+
+    assert await clock.wait(event, 3600) is True
+    assert clock.now() == 0
+
+
+@pytest.mark.asyncio
+async def test_monotonic_wait():
+    clock = MonotonicClock()
+    event = asyncio.Event()
+
+    assert await clock.wait(event, 0.01) is False
+    event.set()
+    assert await clock.wait(event, None) is True
+
+
+def test_clock_requires_now_and_wait():
+    class NowOnly(Clock):
+        def now(self) -> float:
+            return 0.0
+
+    with pytest.raises(TypeError):
+        NowOnly()
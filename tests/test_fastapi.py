@@ -1,6 +1,16 @@
+import asyncio
+import json
+
 import pytest
+from fastapi import WebSocketDisconnect
 from fastapi.testclient import TestClient
-from app.main import app
+from app.main import app, render_index
+from app.serializer import BINARY_EVENT, decode_binary
+
+
+@pytest.fixture(autouse=True)
+def library_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("INTERVAL_TIMER_LIBRARY_PATH", str(tmp_path / "library.db"))
 
 
 @pytest.fixture
@@ -14,6 +24,16 @@ def test_home(client):
     response = client.get("/")
     assert response.status_code == 200
     assert "text/html" in response.headers["content-type"]
+    assert "<title>Sport Interval Timer</title>" in response.text
+
+    # rendered once, later requests reuse the page
+    assert client.get("/").content == response.content
+    assert render_index.cache_info().hits >= 1
+
+
+def test_static_files(client):
+    assert client.get("/static/keep").status_code == 200
+    assert client.get("/static/missing").status_code == 404
 
 
 def test_get_training(client):
@@ -55,3 +75,318 @@ def test_timer_actions(client, action):
 def test_timer_invalid_action(client):
     response = client.post("/timer", json={"action": "invalid"})
     assert response.status_code == 422
+
+
+def test_session_training_is_scoped(client):
+    payload = {
+        "intervals": [{"name": "Sprint", "time_seconds": 20}],
+        "name": "Session Workout",
+    }
+
+    response = client.post("/sessions/gym-1/training", json=payload)
+    assert response.status_code == 200
+
+    assert client.get("/sessions/gym-1/training").json()["name"] == "Session Workout"
+    assert client.get("/sessions/gym-2/training").json()["name"] == "My Workout"
+    assert client.get("/training").json()["name"] == "My Workout"
+
+
+def test_session_timer_is_scoped(client):
+    response = client.post("/sessions/gym-1/timer", json={"action": "start"})
+    assert response.json()["status"] == "running"
+
+    response = client.post("/timer", json={"action": "stop"})
+    assert response.json()["status"] == "stopped"
+
+
+def test_delete_session(client):
+    client.get("/sessions/gym-1/training")
+
+    assert client.delete("/sessions/gym-1").status_code == 204
+    assert client.delete("/sessions/gym-1").status_code == 404
+    assert client.delete("/sessions/default").status_code == 400
+
+
+def test_invalid_session_id(client):
+    response = client.get("/sessions/not%20valid/training")
+    assert response.status_code == 422
+
+
+def test_get_timeline(client):
+    response = client.get("/training/timeline", params={"offset": 18, "limit": 5})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_entries"] == 20
+    assert data["total_seconds"] == 3600
+    assert [e["position"] for e in data["entries"]] == [18, 19]
+    assert data["entries"][1]["start_seconds"] == 3540
+    assert data["next_offset"] is None
+
+
+def test_get_timeline_limit_is_bounded(client):
+    response = client.get("/training/timeline", params={"limit": 100_000})
+    assert response.status_code == 422
+
+
+def test_simulate_training(client):
+    payload = {
+        "intervals": [
+            {"name": "Work", "time_seconds": 2},
+            {"name": "Rest", "time_seconds": 1},
+        ],
+        "max_rounds": 2,
+        "name": "Simulated",
+    }
+
+    response = client.post("/training/simulate", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert len(events) == 7
+    assert events[0]["remaining_seconds"] == 1
+    assert events[-1]["status"] == "completed"
+    assert events[-1]["duration"] == 6.0
+
+
+def test_simulate_unbounded_training_needs_max_seconds(client):
+    payload = {"intervals": [{"name": "Work", "time_seconds": 2}], "name": "Open"}
+
+    response = client.post("/training/simulate", json=payload)
+    assert response.status_code == 400
+
+    response = client.post(
+        "/training/simulate", json=payload, params={"max_seconds": 10}
+    )
+    assert len(response.text.splitlines()) == 10
+
+
+def test_websocket_json(client):
+    with client.websocket_connect("/ws/workout") as ws:
+        assert ws.receive_json()["status"] == "stopped"
+
+        ws.send_json({"action": "start"})
+        event = ws.receive_json()
+        assert event["status"] == "running"
+        assert event["interval_name"] == "Roll"
+
+        ws.send_json({"action": "stop"})
+        assert ws.receive_json()["status"] == "stopped"
+
+
+def test_websocket_binary(client):
+    with client.websocket_connect("/sessions/gym-1/ws?encoding=binary") as ws:
+        frame = ws.receive_bytes()
+        assert len(frame) == BINARY_EVENT.size
+        event = decode_binary(frame)
+        assert event["status"] == "stopped"
+        assert event["remaining_seconds"] == 300
+        assert event["max_rounds"] == 10
+
+        ws.send_json({"action": "start"})
+        assert decode_binary(ws.receive_bytes())["status"] == "running"
+
+
+def test_websocket_closes_when_session_is_deleted(client):
+    with client.websocket_connect("/sessions/gone/ws") as ws:
+        ws.receive_json()
+        assert client.delete("/sessions/gone").status_code == 204
+
+        with pytest.raises(WebSocketDisconnect):
+            ws.receive_json()
+
+
+def test_websocket_invalid_action(client):
+    with client.websocket_connect("/ws/workout") as ws:
+        ws.receive_json()
+        ws.send_json({"action": "jump"})
+        assert ws.receive_json() == {"detail": "Invalid action"}
+
+
+def test_state_survives_restart(tmp_path, monkeypatch):
+    monkeypatch.setenv("INTERVAL_TIMER_JOURNAL_PATH", str(tmp_path / "journal"))
+    payload = {"intervals": [{"name": "Sprint", "time_seconds": 20}], "name": "Kept"}
+
+    with TestClient(app) as c:
+        c.post("/sessions/gym-1/training", json=payload)
+        c.post("/sessions/gym-1/timer", json={"action": "start"})
+        c.post("/training", json=payload)
+
+    with TestClient(app) as c:
+        assert c.get("/sessions/gym-1/training").json()["name"] == "Kept"
+        assert c.get("/training").json()["name"] == "Kept"
+        with c.websocket_connect("/sessions/gym-1/ws") as ws:
+            assert ws.receive_json()["status"] == "running"
+
+
+def test_metrics(client):
+    client.post("/sessions/gym-1/timer", json={"action": "start"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "interval_timer_sessions 2" in response.text
+    assert 'interval_timer_workouts{state="running"} 1' in response.text
+    assert "interval_timer_control_seconds_count" in response.text
+    assert "interval_timer_tick_lateness_seconds_bucket" in response.text
+    assert "process_cpu_seconds_total" in response.text
+    assert "process_resident_memory_bytes" in response.text
+
+
+def test_get_drift(client):
+    for url in ("/drift", "/sessions/gym-1/drift"):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json()["count"] == 0
+
+
+def test_library_crud_and_start(client):
+    training = {
+        "name": "Saved",
+        "max_rounds": 2,
+        "intervals": [{"name": "Go", "time_seconds": 30}],
+        "owner": "ann",
+        "tags": ["short"],
+    }
+    response = client.post("/library", json=training)
+    assert response.status_code == 201
+    entry = response.json()
+    assert entry["version"] == 1
+    assert entry["training"]["name"] == "Saved"
+
+    response = client.put(f"/library/{entry['id']}", json={**training, "version": 2})
+    assert response.status_code == 409
+    response = client.put(f"/library/{entry['id']}", json={**training, "version": 1})
+    assert response.json()["version"] == 2
+
+    page = client.get("/library", params={"tag": "short", "limit": 1}).json()
+    assert [e["id"] for e in page["entries"]] == [entry["id"]]
+
+    response = client.post(f"/library/{entry['id']}/start")
+    assert response.json() == {"status": "running"}
+    assert client.get("/training").json()["name"] == "Saved"
+    response = client.post(f"/sessions/abc/library/{entry['id']}/start")
+    assert response.json() == {"status": "running"}
+
+    assert client.delete(f"/library/{entry['id']}").status_code == 204
+    assert client.get(f"/library/{entry['id']}").status_code == 404
+    assert client.post(f"/library/{entry['id']}/start").status_code == 404
+
+
+async def first_sse_message(path, headers):
+    """First chunk of an SSE response, then disconnect like a browser would."""
+    received = asyncio.Event()
+    chunks = []
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await received.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks.append(message["body"])
+            received.set()
+
+    await asyncio.wait_for(app(scope, receive, send), 5)
+    return chunks[0]
+
+
+def sse_id(message):
+    return message.split(b"id: ")[1].split(b"\n")[0].decode()
+
+
+@pytest.mark.parametrize("path", ["/workout", "/sessions/resume/workout"])
+def test_workout_stream_resumes_from_last_event_id(client, path):
+    first = client.portal.call(first_sse_message, path, {})
+    assert first.startswith(b"retry: ")
+    event_id = sse_id(first)
+
+    resumed = client.portal.call(first_sse_message, path, {"Last-Event-ID": event_id})
+    # same broadcaster, ids keep counting up
+    epoch, sequence = event_id.split("-")
+    assert sse_id(resumed) == f"{epoch}-{int(sequence) + 1}"
+
+    # ids from before a restart look alike but carry another epoch
+    stale = f"{int(epoch, 16) ^ 1:08x}-{sequence}"
+    resumed = client.portal.call(first_sse_message, path, {"Last-Event-ID": stale})
+    assert resumed.startswith(b"retry: ")
+    assert b"\ndata: " in resumed
+
+
+@pytest.mark.parametrize("hz", ["0", "-1", "1.5", "fast"])
+def test_workout_stream_rejects_invalid_rate(client, hz):
+    assert client.get("/workout", params={"hz": hz}).status_code == 422
+    assert client.get("/sessions/s/workout", params={"hz": hz}).status_code == 422
+
+
+def test_library_bulk_import_and_export(client):
+    body = (
+        "training,interval,time_seconds\nBulk,Work,20\nBulk,Rest,10\nOther,Work,nope\n"
+    )
+    response = client.post("/library/import?format=csv", content=body)
+    assert response.status_code == 200
+    assert response.json()["imported"] == 1
+    assert response.json()["errors"][0]["line"] == 4
+
+    response = client.get("/library/export", params={"name": "Bulk"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    (line,) = response.text.splitlines()
+    assert json.loads(line)["intervals"][1]["name"] == "Rest"
+
+    response = client.post("/library/import?format=csv", content="a,b\n")
+    assert response.status_code == 400
+
+
+def test_nested_training(client):
+    payload = {
+        "name": "Circuit",
+        "max_rounds": 1,
+        "intervals": [
+            {"name": "Warmup", "time_seconds": 60},
+            {
+                "name": "Tabata",
+                "repeat": 8,
+                "rest_seconds": 30,
+                "intervals": [
+                    {"name": "Work", "time_seconds": 20},
+                    {"name": "Rest", "time_seconds": 10},
+                ],
+            },
+        ],
+    }
+    response = client.post("/sessions/nested/training", json=payload)
+    assert response.status_code == 200
+    block = response.json()["intervals"][1]
+    assert (block["repeat"], block["rest_seconds"]) == (8, 30)
+    assert [i["name"] for i in block["intervals"]] == ["Work", "Rest"]
+
+    timeline = client.get("/sessions/nested/training/timeline").json()
+    assert timeline["total_entries"] == 1 + 8 * 2 + 7
+    assert timeline["total_seconds"] == 60 + 8 * 30 + 7 * 30
+    assert [e["name"] for e in timeline["entries"][1:5]] == [
+        "Work",
+        "Rest",
+        "Rest",
+        "Work",
+    ]
+
+    payload["intervals"][1]["intervals"] = []
+    assert client.post("/sessions/nested/training", json=payload).status_code == 422
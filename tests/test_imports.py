@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def loaded_modules(module):
+    code = f"import sys, {module}; print(' '.join(sys.modules))"
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return set(output.split())
+
+
+@pytest.mark.parametrize("module", ["app.core", "app.session"])
+def test_timer_core_imports_without_web_stack(module):
+    modules = loaded_modules(module)
+
+    assert not {"pydantic", "fastapi", "starlette", "jinja2"} & modules
+
+
+def test_app_defers_templates():
+    assert "jinja2" not in loaded_modules("app.main")
@@ -0,0 +1,117 @@
+import pytest
+
+from app.core import Workout
+from app.journal import Journal
+from app.model import WorkoutStatus
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "journal.jsonl")
+
+
+@pytest.mark.asyncio
+async def test_recovers_latest_state(path):
+    journal = Journal(path)
+    journal.load()
+    await journal.start()
+
+    workout = Workout()
+    workout.start()
+    journal.record_training("a", {"name": "Run", "intervals": []})
+    journal.record_timer("a", workout)
+    journal.record_training("b", {"name": "Swim", "intervals": []})
+    journal.record_delete("b")
+    await journal.close()
+
+    state = Journal(path).load()
+
+    assert list(state) == ["a"]
+    assert state["a"]["training"]["name"] == "Run"
+    assert state["a"]["timer"]["status"] == "running"
+
+
+@pytest.mark.asyncio
+async def test_restored_timer_keeps_elapsed_time(path):
+    journal = Journal(path)
+    await journal.start()
+    workout = Workout()
+    workout.start()
+    workout._started_at -= 42
+    journal.record_timer("a", workout)
+    await journal.close()
+
+    restored = Workout()
+    Journal.restore_timer(restored, Journal(path).load()["a"]["timer"])
+
+    assert restored.get_state() == WorkoutStatus.RUNNING
+    active, paused = restored.get_elapsed(restored.get_clock().now())
+    assert active == pytest.approx(42, abs=0.5)
+    assert paused == 0
+
+
+@pytest.mark.asyncio
+async def test_recording_does_not_write_until_flush(path):
+    journal = Journal(path, flush_seconds=3600)
+    await journal.start()
+
+    journal.record_delete("a")
+    with open(path) as f:
+        assert f.read() == ""
+
+    await journal.flush()
+    with open(path) as f:
+        assert f.read().count("\n") == 1
+    await journal.close()
+
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_only_latest_state(path):
+    journal = Journal(path, flush_seconds=3600, compact_after=10)
+    await journal.start()
+    workout = Workout()
+    for _ in range(20):
+        workout.start()
+        journal.record_timer("a", workout)
+        workout.stop()
+        journal.record_timer("a", workout)
+    await journal.close()
+
+    with open(path) as f:
+        assert len(f.readlines()) == 1
+    assert Journal(path).load()["a"]["timer"]["status"] == "stopped"
+
+
+@pytest.mark.asyncio
+async def test_torn_last_line_is_ignored(path):
+    with open(path, "w") as f:
+        f.write('{"type": "delete", "session": "a"}\n{"type": "tim')
+
+    journal = Journal(path)
+    assert journal.load() == {}
+
+    # records after a recovery are not glued to the torn fragment
+    await journal.start()
+    journal.record_training("gym", {"name": "Gym"})
+    await journal.close()
+
+    assert Journal(path).load() == {"gym": {"training": {"name": "Gym"}}}
+
+
+@pytest.mark.asyncio
+async def test_compaction_is_relative_to_the_folded_state(path):
+    journal = Journal(path, flush_seconds=3600, compact_after=10)
+    await journal.start()
+    for i in range(20):
+        journal.record_training(f"s{i}", {"name": "Gym"})
+    await journal.flush()
+    with open(path) as f:
+        assert len(f.readlines()) == 20
+
+    # a few more records do not rewrite a journal that is mostly live state
+    journal.record_training("s0", {"name": "Other"})
+    await journal.flush()
+    await journal.close()
+
+    with open(path) as f:
+        assert len(f.readlines()) == 21
@@ -0,0 +1,103 @@
+import pytest
+
+from app.library import Library, VersionConflictError
+from app.model import IntervalCreate, TrainingCreate
+
+
+def payload(name="Run", seconds=60):
+    return TrainingCreate(
+        name=name,
+        max_rounds=2,
+        intervals=[IntervalCreate(name="Go", time_seconds=seconds)],
+    )
+
+
+@pytest.fixture
+def library():
+    library = Library(cache_size=2)
+    yield library
+    library.close()
+
+
+def test_create_and_get(library):
+    entry = library.create(payload(), owner="ann", tags=["easy", "easy", "short"])
+
+    assert library.get(entry.id) == entry
+    assert entry.version == 1
+    assert entry.tags == ("easy", "short")
+    assert library.get(entry.id + 1) is None
+
+
+def test_update_bumps_version(library):
+    entry = library.create(payload())
+
+    updated = library.update(entry.id, payload("Swim"), tags=["pool"], version=1)
+
+    assert updated.version == 2
+    assert library.get(entry.id).name == "Swim"
+    assert library.list(tag="pool")[0][0].id == entry.id
+    with pytest.raises(VersionConflictError):
+        library.update(entry.id, payload("Bike"), version=1)
+    assert library.update(entry.id + 1, payload()) is None
+
+
+def test_delete(library):
+    entry = library.create(payload(), tags=["easy"])
+
+    assert library.delete(entry.id)
+    assert not library.delete(entry.id)
+    assert library.get(entry.id) is None
+    assert library.list(tag="easy") == ([], None)
+
+
+def test_list_pages_through_filtered_entries(library):
+    library.create_many(
+        (payload(f"Run {i}"), "ann" if i % 2 else "bob", ["odd"] if i % 2 else [])
+        for i in range(10)
+    )
+
+    names = []
+    cursor = None
+    while True:
+        entries, cursor = library.list(owner="ann", cursor=cursor, limit=2)
+        names += [e.name for e in entries]
+        if cursor is None:
+            break
+
+    assert names == ["Run 1", "Run 3", "Run 5", "Run 7", "Run 9"]
+    assert [e.name for e in library.list(tag="odd", name="Run 3")[0]] == ["Run 3"]
+    assert len(library) == 10
+
+
+def test_get_training_is_cached_until_changed(library):
+    entry = library.create(payload())
+
+    first = library.get_training(entry.id)
+    assert library.get_training(entry.id).training is first.training
+    assert first.training.compile().get_total_seconds() == 120
+
+    library.update(entry.id, payload(seconds=30))
+    second = library.get_training(entry.id)
+    assert second.training is not first.training
+    assert second.training.compile().get_total_seconds() == 60
+
+
+def test_cache_is_bounded(library):
+    entries = library.create_many((payload(f"Run {i}"), "", []) for i in range(3))
+
+    for entry in entries:
+        library.get_training(entry.id)
+
+    assert library.get_cache_size() == 2
+    assert library.get_training(0) is None
+
+
+def test_persists_to_file(tmp_path):
+    path = str(tmp_path / "library.sqlite3")
+    library = Library(path)
+    entry = library.create(payload(), owner="ann")
+    library.close()
+
+    library = Library(path)
+    assert library.get(entry.id) == entry
+    library.close()
@@ -0,0 +1,56 @@
+import math
+
+import pytest
+
+from benchmarks.loadtest import SseParser, Stats, parse_metrics, percentile
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile(values, 0.999) == 100.0
+    assert math.isnan(percentile([], 0.5))
+
+
+def test_sse_parser_handles_split_messages():
+    parser = SseParser()
+
+    assert parser.feed(b"retry: 1000\nid: a-1\ndata: {") == []
+    messages = parser.feed(b'"x": 1}\n\n: keep-alive\n\ndata: 2\n\n')
+
+    assert messages == [
+        {"retry": "1000", "id": "a-1", "data": '{"x": 1}'},
+        {"data": "2"},
+    ]
+
+
+def test_parse_metrics_skips_labelled_samples():
+    text = (
+        "# HELP up Up.\n# TYPE up gauge\nup 1\n"
+        'requests_total{path="/"} 3\nprocess_cpu_seconds_total 0.5\n'
+    )
+
+    assert parse_metrics(text) == {"up": 1.0, "process_cpu_seconds_total": 0.5}
+
+
+def test_stats_measure_latency_and_tick_jitter():
+    stats = Stats(clients=1)
+    stats.action("running")
+    sent = stats.sent_at
+
+    stats.on_event(0, sent + 0.010, {"status": "running"})
+    stats.on_event(0, sent + 1.020, {"status": "running"})
+    stats.on_event(0, sent + 2.000, {"status": "running"})
+    stats.on_event(0, sent + 3.010, {"status": "running"})
+
+    assert stats.events == 4
+    assert stats.latencies == [pytest.approx(0.010)]
+    assert [round(j, 3) for j in stats.jitter] == [0.02, 0.01]
+
+    stats.action("paused")
+    stats.on_event(0, sent + 2.500, {"status": "paused"})
+
+    assert len(stats.latencies) == 2
+    assert len(stats.jitter) == 2
@@ -0,0 +1,54 @@
+import pytest
+
+from app.metrics import CallbackGauge, Counter, Histogram, Metric, Registry
+
+
+def test_counter_render():
+    counter = Counter("events_total", "Events.")
+    counter.inc()
+    counter.inc(2)
+
+    assert counter.render() == (
+        "# HELP events_total Events.\n# TYPE events_total counter\nevents_total 3"
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5):
+        histogram.observe(value)
+
+    lines = histogram.render().splitlines()[2:]
+
+    assert lines == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 5.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_callback_gauge_with_label():
+    gauge = CallbackGauge(
+        "workouts", "Workouts.", lambda: {"running": 2, "stopped": 1}, label="state"
+    )
+
+    assert gauge.render().splitlines()[2:] == [
+        'workouts{state="running"} 2',
+        'workouts{state="stopped"} 1',
+    ]
+
+
+def test_registry_replaces_metric_with_same_name():
+    registry = Registry()
+    registry.register(Counter("events_total", "Old."))
+    registry.register(Counter("events_total", "New."))
+
+    assert registry.render().count("# HELP events_total") == 1
+    assert "New." in registry.render()
+
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        Metric("plain", "No samples.")
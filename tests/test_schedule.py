@@ -0,0 +1,135 @@
+import pytest
+
+from app.core import Block, Interval, Schedule, Training
+
+
+@pytest.fixture
+def schedule():
+    training = Training(
+        "Test",
+        [Interval("Work", 60), Interval("Rest", 30)],
+        max_rounds=2,
+    )
+    return Schedule(training)
+
+
+def test_schedule_lengths(schedule):
+    assert schedule.get_round_seconds() == 90
+    assert schedule.get_total_seconds() == 180
+
+
+def test_total_seconds_unbounded():
+    schedule = Schedule(Training("Open", [Interval("Work", 10)]))
+
+    assert schedule.get_total_seconds() is None
+    assert schedule.is_finished(10**9) is False
+    assert schedule.locate(25) == (2, 0, 5)
+
+
+@pytest.mark.parametrize(
+    "elapsed, expected",
+    [
+        (0, (0, 0, 60)),
+        (10.5, (0, 0, 49.5)),
+        (60, (0, 1, 30)),
+        (89, (0, 1, 1)),
+        (90, (1, 0, 60)),
+        (175, (1, 1, 5)),
+    ],
+)
+def test_locate(schedule, elapsed, expected):
+    assert schedule.locate(elapsed) == expected
+
+
+def test_locate_after_finish(schedule):
+    assert schedule.is_finished(180) is True
+    assert schedule.locate(500) == (2, 1, 0.0)
+
+
+def test_training_compiles_once():
+    training = Training("Test", [Interval("Work", 60)])
+
+    assert training.compile() is training.compile()
+
+
+def test_state_at(schedule):
+    state = Training(
+        "Test", [Interval("Work", 60), Interval("Rest", 30)], max_rounds=2
+    ).state_at(100)
+
+    assert state.current_round == 1
+    assert state.interval.get_name() == "Work"
+    assert state.remaining == 50
+    assert state.finished is False
+    assert schedule.state_at(180).finished is True
+
+
+def test_entries_are_paginated(schedule):
+    entries = list(schedule.entries(offset=1, limit=2))
+
+    assert [(e.current_round, e.index) for e in entries] == [(0, 1), (1, 0)]
+    assert (entries[0].start, entries[0].end) == (60, 90)
+    assert (entries[1].start, entries[1].end) == (90, 150)
+    assert len(list(schedule.entries(offset=3))) == 1
+
+
+def test_entries_of_unbounded_training():
+    schedule = Schedule(Training("Open", [Interval("Work", 10)]))
+
+    entries = list(schedule.entries(offset=1_000_000, limit=1))
+
+    assert schedule.get_entry_count() is None
+    assert entries[0].current_round == 1_000_000
+    assert entries[0].start == 10_000_000
+
+
+def _expand(items):
+    """Flat intervals of one round, the slow way."""
+    flat = []
+    for item in items:
+        if isinstance(item, Block):
+            body = _expand(list(item.get_intervals()))
+            for repetition in range(item.get_repeat()):
+                flat += body
+                if item.get_rest() and repetition < item.get_repeat() - 1:
+                    flat.append(item.get_rest())
+        else:
+            flat.append(item)
+    return flat
+
+
+@pytest.fixture
+def nested():
+    tabata = Block(
+        "Tabata", [Interval("Work", 20), Interval("Rest", 10)], repeat=3, rest_seconds=5
+    )
+    circuit = Block("Circuit", [tabata, Interval("Jog", 7)], repeat=2)
+    return Training("Nested", [Interval("Warmup", 30), circuit], max_rounds=2)
+
+
+def test_nested_schedule_matches_expansion(nested):
+    schedule = nested.compile()
+    flat = _expand(list(nested.get_intervals()))
+    flat_schedule = Training("Flat", flat, max_rounds=2).compile()
+
+    assert schedule.get_interval_count() == len(flat) == 1 + 2 * (3 * 2 + 2 + 1)
+    assert schedule.get_round_seconds() == flat_schedule.get_round_seconds()
+    for elapsed in [x * 0.5 for x in range(int(flat_schedule.get_total_seconds()) * 2)]:
+        state = schedule.state_at(elapsed)
+        assert schedule.locate(elapsed) == flat_schedule.locate(elapsed)
+        assert state.interval is flat[state.index]
+    assert list(schedule.entries()) == list(flat_schedule.entries())
+
+
+def test_nested_schedule_stays_compact():
+    block = Block("Inner", [Interval("Work", 1), Interval("Rest", 1)], repeat=1000)
+    training = Training("Huge", [Block("Outer", [block], repeat=1000, rest_seconds=60)])
+    schedule = training.compile()
+
+    assert schedule.get_interval_count() == 1000 * 2000 + 999
+    # the last work interval of the 500th outer repetition
+    elapsed = 499 * (2000 + 60) + 1998.5
+    assert schedule.locate(elapsed) == (0, 499 * 2001 + 1998, 0.5)
+    assert schedule.state_at(elapsed + 1.5).interval.get_time_seconds() == 60
+    (entry,) = schedule.entries(offset=2001, limit=1)
+    assert (entry.interval.get_name(), entry.start) == ("Work", 2060)
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from app.core import WorkoutEvent
+from app.model import IntervalEvent, WorkoutStatus
+from app.serializer import (
+    BINARY_EVENT,
+    decode_binary,
+    encode_binary,
+    encode_event,
+    encode_sse,
+)
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        WorkoutEvent("Warmup", 0, WorkoutStatus.RUNNING, 61, 0, 1, 1, 2, 10, 12.5, 0.0),
+        WorkoutEvent(
+            "Cool down", 2, WorkoutStatus.STOPPED, 300, 0, 5, 0, 0, None, 0, 0
+        ),
+        WorkoutEvent(
+            'Sä "quoted"', 1, WorkoutStatus.PAUSED, 1, 0, 0, 1, 0, 1, 1.1, 3.3
+        ),
+    ],
+)
+def test_encode_event_matches_pydantic(event):
+    expected = IntervalEvent(**event._asdict()).model_dump_json()
+
+    assert json.loads(encode_event(event)) == json.loads(expected)
+    assert list(json.loads(encode_event(event))) == list(json.loads(expected))
+
+
+def test_encode_sse():
+    event = WorkoutEvent(
+        "Work", 0, WorkoutStatus.RUNNING, 5, 0, 0, 5, 0, None, 1.0, 0.0
+    )
+
+    data = encode_sse(event)
+
+    assert data.startswith(b"data: {")
+    assert data.endswith(b"}\n\n")
+    assert data[len(b"data: ") : -2] == encode_event(event)
+
+
+def test_binary_roundtrip():
+    event = WorkoutEvent("Work", 3, WorkoutStatus.PAUSED, 61, 0, 1, 1, 2, 10, 12.5, 1.5)
+
+    data = encode_binary(event)
+
+    assert len(data) == BINARY_EVENT.size == 28
+    assert decode_binary(data) == {
+        "interval_index": 3,
+        "status": WorkoutStatus.PAUSED,
+        "remaining_seconds": 61,
+        "current_round": 2,
+        "max_rounds": 10,
+        "duration": 12.5,
+        "paused": 1.5,
+    }
+
+
+def test_binary_without_max_rounds():
+    event = WorkoutEvent("Work", 0, WorkoutStatus.RUNNING, 5, 0, 0, 5, 0, None, 1, 0)
+
+    assert decode_binary(encode_binary(event))["max_rounds"] is None
+
+
+def test_binary_supports_large_interval_index():
+    event = WorkoutEvent("Work", 69_999, WorkoutStatus.RUNNING, 5, 0, 0, 5, 0, 1, 1, 0)
+
+    assert decode_binary(encode_binary(event))["interval_index"] == 69_999
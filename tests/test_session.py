@@ -0,0 +1,76 @@
+import pytest
+
+from app.core import Interval, Training
+from app.session import Session, SessionLimitError, SessionRegistry
+
+
+@pytest.fixture
+def training():
+    return Training("Default", [Interval("Work", 60)])
+
+
+def test_get_creates_and_reuses_session(training):
+    registry = SessionRegistry(training)
+
+    session = registry.get("a")
+
+    assert session.get_id() == "a"
+    assert session.get_training() is training
+    assert registry.get("a") is session
+    assert len(registry) == 1
+
+
+def test_sessions_are_independent(training):
+    registry = SessionRegistry(training)
+
+    registry.get("a").get_timer().start()
+
+    assert registry.get("b").get_timer().get_state() == "stopped"
+
+
+def test_least_recently_used_session_is_evicted(training):
+    registry = SessionRegistry(training, max_sessions=2)
+
+    registry.get("a")
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")
+
+    assert "a" in registry
+    assert "b" not in registry
+    assert "c" in registry
+
+
+def test_idle_sessions_expire(training, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("app.session.time.monotonic", lambda: now[0])
+    registry = SessionRegistry(training, ttl_seconds=60)
+
+    registry.get("a")
+    now[0] = 30.0
+    registry.get("b")
+    now[0] = 70.0
+
+    assert registry.evict() == 1
+    assert "a" not in registry
+    assert "b" in registry
+
+
+def test_pinned_session_is_never_evicted(training):
+    registry = SessionRegistry(training, max_sessions=1, ttl_seconds=0)
+    default = registry.pin("default")
+
+    registry.get("a")
+    registry.get("b")
+
+    assert registry.get("default") is default
+    assert "a" not in registry
+
+
+def test_limit_reached_when_all_sessions_active(training, monkeypatch):
+    registry = SessionRegistry(training, max_sessions=1)
+    registry.get("a")
+    monkeypatch.setattr(Session, "is_active", lambda self: True)
+
+    with pytest.raises(SessionLimitError):
+        registry.get("b")
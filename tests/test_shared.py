@@ -0,0 +1,136 @@
+import uuid
+
+import pytest
+
+from app.core import Interval, Training
+from app.model import IntervalCreate, TrainingCreate, WorkoutStatus
+from app.session import Session
+from app.shared import _SEQUENCE, SharedSessionSync, SharedWorkoutState
+
+
+@pytest.fixture
+def name():
+    name = f"interval-timer-test-{uuid.uuid4().hex[:8]}"
+    yield name
+    cleanup = SharedWorkoutState(name, capacity=1024)
+    cleanup.unlink()
+    cleanup.close()
+
+
+def new_session():
+    return Session("default", Training("Default", [Interval("Roll", 300)]))
+
+
+def test_read_returns_none_before_publish(name):
+    state = SharedWorkoutState(name, capacity=1024)
+
+    assert state.read() is None
+    state.close()
+
+
+def test_publish_is_visible_to_other_attachments(name):
+    writer = SharedWorkoutState(name, capacity=1024)
+    reader = SharedWorkoutState(name, capacity=1024)
+    session = new_session()
+    session.get_timer().start()
+    record = session.get_timer().get_record()
+
+    sequence, version = writer.publish(record, b'{"name": "Run"}')
+    snapshot = reader.read()
+
+    assert snapshot.sequence == sequence == reader.get_sequence()
+    assert snapshot.record == record
+    assert snapshot.training_version == version == 1
+    assert snapshot.training == b'{"name": "Run"}'
+    writer.close()
+    reader.close()
+
+
+def test_training_larger_than_capacity_is_rejected(name):
+    state = SharedWorkoutState(name, capacity=1024)
+    record = new_session().get_timer().get_record()
+
+    with pytest.raises(ValueError):
+        state.publish(record, b"x" * 2048)
+    state.close()
+
+
+def test_sessions_follow_each_other(name):
+    first, second = new_session(), new_session()
+    first_sync = SharedSessionSync(SharedWorkoutState(name, capacity=1024), first)
+    second_sync = SharedSessionSync(SharedWorkoutState(name, capacity=1024), second)
+
+    payload = TrainingCreate(
+        name="Swim",
+        max_rounds=2,
+        intervals=[IntervalCreate(name="Lap", time_seconds=60)],
+    )
+    first.set_training(Training("Swim", [Interval("Lap", 60)], max_rounds=2))
+    first_sync.publish_training(payload)
+    first.get_timer().start()
+    first_sync.publish_timer()
+    second_sync.pull()
+
+    assert second.get_training().get_name() == "Swim"
+    assert second.get_timer().get_state() == WorkoutStatus.RUNNING
+    assert second.get_timer().get_record() == first.get_timer().get_record()
+
+    second.get_timer().pause()
+    second_sync.publish_timer()
+    first_sync.pull()
+
+    assert first.get_timer().get_state() == WorkoutStatus.PAUSED
+    # a worker does not re-apply its own training
+    assert first_sync._training_version == 1
+
+
+def test_recovers_from_writer_dying_mid_write(name):
+    state = SharedWorkoutState(name, capacity=1024)
+    record = new_session().get_timer().get_record()
+    sequence, _ = state.publish(record)
+    # a writer crashed after marking the state as being written
+    _SEQUENCE.pack_into(state._shm.buf, 0, sequence + 1)
+
+    # readers give up instead of spinning forever
+    assert state.read() is None
+
+    sequence, _ = state.publish(record)
+    assert sequence % 2 == 0
+    assert state.read().sequence == sequence
+    state.close()
+
+
+def test_updates_apply_on_top_of_other_workers_changes(name):
+    first, second = new_session(), new_session()
+    first_sync = SharedSessionSync(SharedWorkoutState(name, capacity=1024), first)
+    second_sync = SharedSessionSync(SharedWorkoutState(name, capacity=1024), second)
+
+    with first_sync.update():
+        first.get_timer().start()
+        first_sync.publish_timer()
+    # the second worker has not polled yet, its pause still sees the start
+    with second_sync.update():
+        second.get_timer().pause()
+        second_sync.publish_timer()
+    first_sync.pull()
+
+    assert first.get_timer().get_state() == WorkoutStatus.PAUSED
+    assert second.get_timer().get_record() == first.get_timer().get_record()
+
+
+def test_publish_does_not_skip_unapplied_training(name):
+    first, second = new_session(), new_session()
+    first_sync = SharedSessionSync(SharedWorkoutState(name, capacity=1024), first)
+    second_sync = SharedSessionSync(SharedWorkoutState(name, capacity=1024), second)
+
+    payload = TrainingCreate(
+        name="Swim", intervals=[IntervalCreate(name="Lap", time_seconds=60)]
+    )
+    with first_sync.update():
+        first.set_training(Training("Swim", [Interval("Lap", 60)]))
+        first_sync.publish_training(payload)
+    # published without pulling first, the training is still picked up later
+    second_sync.publish_timer()
+    second_sync.pull()
+
+    assert second.get_training().get_name() == "Swim"
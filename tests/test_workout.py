@@ -1,7 +1,17 @@
 import pytest
+import asyncio
+import threading
 import time
 
-from app.core import Interval, Training, Workout
+from app.clock import VirtualClock
+from app.core import (
+    DriftStats,
+    Interval,
+    Schedule,
+    Training,
+    Workout,
+    simulate,
+)
 from app.model import WorkoutStatus  # adjust import path as needed
 
 
@@ -45,3 +55,264 @@ def test_run_workflow(training):
             assert event.max_rounds == 1
             assert event.paused == 0
             break
+
+
+def test_snapshot_is_stateless(training):
+    clock = VirtualClock(100.0)
+    workout = Workout(clock=clock)
+    schedule = Schedule(training)
+
+    workout.start()
+    clock.advance(2.5)
+    event = workout.snapshot(schedule)
+    assert event.interval_name == "Climb"
+    assert event.remaining_seconds == 0
+    assert event.status == WorkoutStatus.RUNNING
+
+    # asking again at the same time gives the same answer
+    assert workout.snapshot(schedule) == event
+
+
+def test_stopped_snapshot_shows_full_interval(training):
+    clock = VirtualClock(100.0)
+    workout = Workout(clock=clock)
+    schedule = Schedule(training)
+
+    event = workout.snapshot(schedule)
+    assert event.status == WorkoutStatus.STOPPED
+    assert (event.remaining_seconds, event.remaining_ss) == (2, 2)
+
+    # once running, an exact boundary already shows the next second
+    workout.start()
+    assert workout.snapshot(schedule).remaining_seconds == 1
+
+
+def test_pause_is_not_counted(training):
+    clock = VirtualClock()
+    workout = Workout(clock=clock)
+    schedule = Schedule(training)
+
+    workout.start()
+    clock.advance(0.5)
+    workout.pause()
+    clock.advance(10.0)
+    event = workout.snapshot(schedule)
+    assert event.interval_name == "Roll"
+    assert event.remaining_seconds == 1
+    assert event.paused == 10.0
+
+    workout.start()
+    clock.advance(3.0)
+    event = workout.snapshot(schedule)
+    assert event.status == WorkoutStatus.COMPLETED
+    assert event.duration == 13.0
+    assert event.paused == 10.0
+
+
+def test_next_change_is_next_second_boundary(training):
+    clock = VirtualClock()
+    workout = Workout(clock=clock)
+    schedule = Schedule(training)
+
+    assert workout.get_next_change(schedule) is None
+
+    workout.start()
+    clock.advance(0.25)
+    assert workout.get_next_change(schedule) == pytest.approx(0.75)
+
+    workout.pause()
+    assert workout.get_next_change(schedule) is None
+
+
+@pytest.mark.asyncio
+async def test_arun_wakes_on_control_action(training):
+    workout = Workout()
+    events = workout.arun(training)
+
+    assert (await anext(events)).status == WorkoutStatus.STOPPED
+
+    started = time.monotonic()
+    asyncio.get_running_loop().call_later(0.01, workout.start)
+    event = await anext(events)
+
+    assert event.status == WorkoutStatus.RUNNING
+    assert time.monotonic() - started < 0.5
+    await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_arun_ticks_once_per_second():
+    workout = Workout()
+    workout.start()
+    training = Training("Short", [Interval("Go", 1)], max_rounds=1)
+
+    events = []
+    async for event in workout.arun(training):
+        events.append(event)
+        if event.status == WorkoutStatus.COMPLETED:
+            break
+
+    assert [e.remaining_seconds for e in events] == [0, 0]
+    assert events[-1].duration == 1.0
+
+
+@pytest.mark.asyncio
+async def test_arun_simulates_whole_workout_on_virtual_clock():
+    clock = VirtualClock()
+    workout = Workout(clock=clock)
+    training = Training(
+        "Long", [Interval("Roll", 300), Interval("Climb", 60)], max_rounds=10
+    )
+    workout.start()
+
+    events = []
+    async for event in workout.arun(training):
+        events.append(event)
+        if event.status == WorkoutStatus.COMPLETED:
+            break
+
+    # one event per second of the hour-long workout, plus the final one
+    assert len(events) == 3601
+    assert events[-1].duration == 3600.0
+    assert events[-1].current_round == 10
+    assert clock.now() == pytest.approx(3600.0)
+
+
+def test_simulate_trace(training):
+    events = list(simulate(training, resolution=0.5))
+
+    assert [e.duration for e in events] == [0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0]
+    assert [e.interval_name for e in events][3:5] == ["Roll", "Climb"]
+    assert events[-1].status == WorkoutStatus.COMPLETED
+    assert events[-1].current_round == 1
+
+
+def test_simulate_matches_live_workout(training):
+    clock = VirtualClock()
+    workout = Workout(clock=clock)
+    schedule = training.compile()
+    workout.start()
+
+    for event in simulate(training, resolution=0.25):
+        clock.advance(event.duration - clock.now())
+        assert workout.snapshot(schedule) == event
+
+
+def test_simulate_unbounded_needs_limit():
+    training = Training("Open", [Interval("Work", 10)])
+
+    with pytest.raises(ValueError, match="max_seconds must be provided"):
+        simulate(training)
+
+    events = list(simulate(training, max_seconds=25))
+    assert len(events) == 25
+    assert events[-1].current_round == 2
+
+
+def test_run_parks_while_idle(training):
+    workout = Workout()
+    events = workout.run(training)
+    received = []
+
+    def consume():
+        for event in events:
+            received.append(event)
+            if event.status == WorkoutStatus.PAUSED:
+                break
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    time.sleep(0.05)
+
+    # stopped: one event, then the generator waits for a control action
+    assert [e.status for e in received] == [WorkoutStatus.STOPPED]
+
+    workout.start()
+    workout.pause()
+    thread.join(timeout=1)
+    assert not thread.is_alive()
+    assert received[-1].status == WorkoutStatus.PAUSED
+
+
+def test_pause_and_resume_accumulate_pause_time(training):
+    clock = VirtualClock()
+    workout = Workout(clock=clock)
+    schedule = training.compile()
+
+    workout.start()
+    for _ in range(3):
+        clock.advance(0.25)
+        workout.pause()
+        clock.advance(5)
+        workout.start()
+
+    # pausing twice or resuming a running workout changes nothing
+    workout.pause()
+    workout.pause()
+    clock.advance(1)
+    workout.start()
+    workout.start()
+
+    event = workout.snapshot(schedule)
+    assert event.paused == 16.0
+    assert event.duration == 16.75
+    assert event.remaining_seconds == 1
+
+
+@pytest.mark.asyncio
+async def test_arun_reports_lateness(training):
+    workout = Workout(clock=VirtualClock())
+    workout.start()
+    lateness = []
+
+    async for event in workout.arun(training, on_lateness=lateness.append):
+        if event.status == WorkoutStatus.COMPLETED:
+            break
+
+    assert lateness == [0.0, 0.0, 0.0]
+
+
+class LateClock(VirtualClock):
+    """Virtual clock whose timed wake-ups always come 3 ms late."""
+
+    async def wait(self, event, timeout):
+        if timeout is None:
+            return await super().wait(event, timeout)
+        return await super().wait(event, timeout + 0.003)
+
+
+def test_drift_stats():
+    drift = DriftStats()
+    for lateness in (0.002, 0.004, -0.001):
+        drift.observe(lateness)
+
+    assert drift.count == 3
+    assert drift.last == -0.001
+    assert drift.get_mean() == pytest.approx(0.005 / 3)
+    assert drift.max == 0.004
+    assert 0 < drift.get_compensation() <= DriftStats.MAX_COMPENSATION
+
+
+def test_drift_compensation_is_bounded():
+    drift = DriftStats()
+    for _ in range(50):
+        drift.observe(1.0)
+
+    assert drift.get_compensation() == DriftStats.MAX_COMPENSATION
+
+
+@pytest.mark.asyncio
+async def test_arun_compensates_drift():
+    workout = Workout(clock=LateClock())
+    training = Training("Long", [Interval("Go", 60)], max_rounds=1)
+    workout.start()
+    drift = DriftStats()
+    lateness = []
+
+    async for event in workout.arun(training, on_lateness=lateness.append, drift=drift):
+        if event.status == WorkoutStatus.COMPLETED:
+            break
+
+    assert lateness[0] == pytest.approx(0.003)
+    assert all(abs(x) < 0.0005 for x in lateness[-30:])
+    assert drift.count == 60